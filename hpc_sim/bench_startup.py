@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for blockchain.py.
+
+The scheduler and dashboard invoke blockchain.py for every balance check and
+stats refresh, so cold start dominates their latency. This script runs the hot
+commands (`stats`, `balance`) under `python -X importtime` against a throwaway
+chain and fails (exit code 1) if:
+  - the import time exceeds the budget,
+  - the wall-clock time exceeds the budget, or
+  - a module that the command should never need (e.g. subprocess) gets imported.
+
+Example:
+  $ ./bench_startup.py --blocks 500 --runs 7
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from blockchain import Blockchain, save_blockchain
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, 'blockchain.py')
+
+# Modules each command must not import. 'stats' is answered from the segment index
+# alone; 'balance' needs pickle for the blocks but never hashes or shells out.
+FORBIDDEN = {
+    'stats': {'subprocess', 'hashlib', 'pickle'},
+    'balance': {'subprocess', 'hashlib'},
+}
+
+
+def build_chain(filename, blocks):
+    with contextlib.redirect_stdout(io.StringIO()):
+        bc = Blockchain(mode='tool', coin_name='BenchCoin')
+        bc.difficulty = 1
+        for i in range(blocks):
+            bc.add_transaction({'type': 'currency', 'sender': 'HPC_Core', 'recipient': f"user{i % 20}",
+                                'amount': 10, 'timestamp': time.time()})
+            bc.mine_pending_transactions('HPC_Core', custom_reward=0)
+    save_blockchain(bc, filename, quiet=True)
+
+
+def run_once(args):
+    """Runs blockchain.py once; returns (wall seconds, import microseconds, imported module names)."""
+    cmd = [sys.executable, '-X', 'importtime', SCRIPT] + args
+    started = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed: {result.stderr.strip()[-500:]}")
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        if not name.startswith('  '):  # Top-level entry: its cumulative time covers its children.
+            total_us += int(cumulative)
+    return wall, total_us, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for blockchain.py stats/balance")
+    parser.add_argument('--blocks', type=int, default=500, help='Blocks in the throwaway benchmark chain.')
+    parser.add_argument('--runs', type=int, default=7, help='Runs per command (the best run is compared to the budget).')
+    parser.add_argument('--import-budget-ms', type=float, default=60.0, help='Maximum import time per command.')
+    parser.add_argument('--wall-budget-ms', type=float, default=250.0, help='Maximum wall-clock time per command.')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='multicoin_bench_')
+    chain = os.path.join(workdir, 'bench.dat')
+    build_chain(chain, args.blocks)
+
+    commands = {
+        'stats': ['--chain', chain, 'stats'],
+        'balance': ['--chain', chain, 'balance', '--address', 'user7'],
+    }
+    report = {'blocks': args.blocks, 'runs': args.runs, 'commands': {}}
+    failures = []
+    try:
+        for name, cmd in commands.items():
+            samples = [run_once(cmd) for _ in range(args.runs)]
+            walls = [s[0] * 1000 for s in samples]
+            imports = [s[1] / 1000 for s in samples]
+            unexpected = sorted(set.union(*(s[2] for s in samples)) & FORBIDDEN[name])
+            report['commands'][name] = {
+                'wall_ms_best': round(min(walls), 2),
+                'wall_ms_median': round(statistics.median(walls), 2),
+                'import_ms_best': round(min(imports), 2),
+                'import_ms_median': round(statistics.median(imports), 2),
+                'unexpected_imports': unexpected,
+            }
+            if min(imports) > args.import_budget_ms:
+                failures.append(f"{name}: import time {min(imports):.1f}ms > {args.import_budget_ms}ms")
+            if min(walls) > args.wall_budget_ms:
+                failures.append(f"{name}: wall time {min(walls):.1f}ms > {args.wall_budget_ms}ms")
+            if unexpected:
+                failures.append(f"{name}: imported {', '.join(unexpected)}")
+    finally:
+        for filename in os.listdir(workdir):
+            os.remove(os.path.join(workdir, filename))
+        os.rmdir(workdir)
+
+    report['failures'] = failures
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,17 +17,98 @@ if sys.version_info < MIN_PYTHON_VERSION:
         % MIN_PYTHON_VERSION
     )
 
-import hashlib
+import bisect
+import json
 import time
-import pickle
-import argparse
 import os
-import subprocess
+import struct
+
+# The scheduler and dashboard run this script constantly, so startup time matters.
+# Heavier modules (hashlib, pickle, argparse, subprocess) are imported inside the
+# functions that need them, so e.g. `stats` never pays for them.
 
 # --- Helper Functions ---
 
+def _find_git_dir(start_dir):
+    """Walks up from start_dir to the enclosing repository's .git directory (or None)."""
+    path = os.path.abspath(start_dir)
+    while True:
+        git_dir = os.path.join(path, '.git')
+        if os.path.isdir(git_dir):
+            return git_dir
+        if os.path.isfile(git_dir):
+            # Worktrees and submodules use a '.git' file pointing at the real directory.
+            with open(git_dir, 'r') as f:
+                content = f.read().strip()
+            if content.startswith('gitdir:'):
+                return os.path.normpath(os.path.join(path, content[len('gitdir:'):].strip()))
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+def _git_stamp(git_dir):
+    """Fingerprints the files git reads for HEAD and the remote URL, so a cached answer can be trusted."""
+    with open(os.path.join(git_dir, 'HEAD'), 'r') as f:
+        head = f.read().strip()
+    stamp = [head]
+    names = ['HEAD', 'config', 'packed-refs']
+    if head.startswith('ref:'):
+        names.append(head[len('ref:'):].strip())
+    for name in names:
+        try:
+            stamp.append(os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return stamp
+
+def _provenance_cache_file():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'multicoin', 'provenance.json')
+
 def get_git_provenance():
-    """Gets the Git remote URL and commit hash of the current repository."""
+    """
+    Gets the Git remote URL and commit hash of the current repository.
+    Answers are cached per repository and reused until HEAD, the current branch
+    or the config changes, so creating a chain does not shell out to git every time.
+    """
+    git_dir = _find_git_dir(os.getcwd())
+    if git_dir is None and 'GIT_DIR' not in os.environ:
+        return {'repo_url': 'N/A', 'commit_hash': 'N/A'}
+
+    cache_file = _provenance_cache_file()
+    key = os.path.realpath(git_dir) if git_dir else os.environ['GIT_DIR']
+    try:
+        stamp = _git_stamp(git_dir) if git_dir else None
+    except OSError:
+        stamp = None
+    cache = {}
+    if stamp is not None:
+        try:
+            with open(cache_file, 'r') as f:
+                cache = json.load(f)
+            entry = cache.get(key)
+            if entry and entry.get('stamp') == stamp:
+                return entry['provenance']
+        except (OSError, ValueError, AttributeError):
+            cache = {}
+
+    provenance = _run_git_provenance()
+    if stamp is not None:
+        cache[key] = {'stamp': stamp, 'provenance': provenance}
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp, cache_file)
+        except OSError:
+            pass  # Caching is best-effort.
+    return provenance
+
+def _run_git_provenance():
+    """Asks git directly for the remote URL and commit hash."""
+    import subprocess
     try:
         # Get the remote URL
         url_result = subprocess.run(
@@ -48,24 +129,189 @@ def get_git_provenance():
         # This will happen if not in a git repo or git is not installed.
         return {'repo_url': 'N/A', 'commit_hash': 'N/A'}
 
+FILE_READ_SIZE = 1 << 20  # bytes per read() when hashing files
+
 def hash_file(filename):
     """Calculates the SHA-256 hash of a file."""
+    import hashlib
     if not os.path.exists(filename):
         print(f"Error: File not found at '{filename}'")
         return None
     hasher = hashlib.sha256()
     try:
         with open(filename, 'rb') as f:
-            chunk = f.read(4096)
+            chunk = f.read(FILE_READ_SIZE)
             while chunk:
                 hasher.update(chunk)
-                chunk = f.read(4096)
+                chunk = f.read(FILE_READ_SIZE)
         return hasher.hexdigest()
     except Exception as e:
         print(f"Error reading file: {e}")
         return None
 
+# --- Merkle Tree File Hashing ---
+# For very large files, `notarize --merkle` splits the file into fixed-size chunks,
+# hashes the chunks in parallel processes and notarizes the Merkle root of the chunk
+# hashes. Leaves and inner nodes are hashed with different prefixes, and an odd node
+# at the end of a level is carried up unchanged. The chunk hashes are kept in a
+# manifest next to the file, so one chunk can be checked against the notarized root
+# without rehashing the rest of the file.
+HASH_MODE_SHA256 = 'sha256'
+HASH_MODE_MERKLE = 'merkle-sha256'
+MERKLE_CHUNK_SIZE = 64 << 20
+MERKLE_LEAF_PREFIX = b'\x00'
+MERKLE_NODE_PREFIX = b'\x01'
+MERKLE_MANIFEST_VERSION = 1
+MERKLE_TX_FIELDS = ('hash_mode', 'chunk_size', 'chunks', 'file_size', 'batch_size')
+
+def merkle_leaf(data):
+    import hashlib
+    return hashlib.sha256(MERKLE_LEAF_PREFIX + data).digest()
+
+def merkle_node(left, right):
+    import hashlib
+    return hashlib.sha256(MERKLE_NODE_PREFIX + left + right).digest()
+
+def merkle_levels(leaves):
+    """Every level of the tree over the given leaf digests, from the leaves up to [root]."""
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [merkle_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+def merkle_root(leaves):
+    """The Merkle root (bytes) of a non-empty list of leaf digests."""
+    return merkle_levels(leaves)[-1][0]
+
+def merkle_proof(leaves, index, levels=None):
+    """
+    The audit path of leaf `index`: a list of [side, sibling hex digest] from the leaf
+    up, where side says whether the sibling goes on the 'L'eft or 'R'ight. Pass the
+    tree's merkle_levels() when building proofs for many leaves of the same tree.
+    """
+    proof = []
+    for level in (levels or merkle_levels(leaves))[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(['L' if sibling < index else 'R', level[sibling].hex()])
+        index //= 2
+    return proof
+
+def verify_merkle_proof(leaf, proof, root):
+    """True if the leaf digest and its audit path lead to the given root (hex)."""
+    node = leaf
+    for side, sibling in proof:
+        sibling = bytes.fromhex(sibling)
+        node = merkle_node(sibling, node) if side == 'L' else merkle_node(node, sibling)
+    return node.hex() == root
+
+def _hash_chunk(job):
+    """Leaf digest of one chunk of a file. Runs in a worker process."""
+    filename, offset, length = job
+    import hashlib
+    hasher = hashlib.sha256(MERKLE_LEAF_PREFIX)
+    with open(filename, 'rb') as f:
+        f.seek(offset)
+        while length > 0:
+            data = f.read(min(FILE_READ_SIZE, length))
+            if not data:
+                break
+            hasher.update(data)
+            length -= len(data)
+    return hasher.digest()
+
+def hash_chunks(filename, chunk_size=MERKLE_CHUNK_SIZE, chunks=None, workers=None):
+    """
+    Leaf digests of a file's chunks (all of them, or only the given chunk numbers),
+    hashed in parallel processes. An empty file has a single, empty chunk.
+    """
+    size = os.path.getsize(filename)
+    count = max(1, -(-size // chunk_size))
+    numbers = range(count) if chunks is None else chunks
+    jobs = [(filename, n * chunk_size, chunk_size) for n in numbers]
+    if len(jobs) <= 1 or workers == 1:
+        return [_hash_chunk(job) for job in jobs]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_hash_chunk, jobs))
+
+def hash_file_merkle(filename, chunk_size=MERKLE_CHUNK_SIZE, workers=None):
+    """Returns (Merkle root hex, leaf digests) of a file, or (None, None) if it cannot be read."""
+    if not os.path.exists(filename):
+        print(f"Error: File not found at '{filename}'")
+        return None, None
+    try:
+        leaves = hash_chunks(filename, chunk_size, workers=workers)
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        return None, None
+    return merkle_root(leaves).hex(), leaves
+
+def merkle_manifest_filename(filename):
+    return filename + '.merkle'
+
+def write_merkle_manifest(filename, root, leaves, chunk_size, manifest=None):
+    """Writes the chunk hashes next to the file (or to `manifest`). Returns the path written."""
+    manifest = manifest or merkle_manifest_filename(filename)
+    data = {
+        'version': MERKLE_MANIFEST_VERSION, 'hash_mode': HASH_MODE_MERKLE,
+        'filename': os.path.basename(filename), 'file_size': os.path.getsize(filename),
+        'chunk_size': chunk_size, 'root': root, 'leaves': [leaf.hex() for leaf in leaves],
+    }
+    tmp = f"{manifest}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, manifest)
+    return manifest
+
+def read_merkle_manifest(manifest):
+    """A manifest whose chunk hashes really combine into its root, else raises ValueError."""
+    with open(manifest, 'r') as f:
+        data = json.load(f)
+    if data.get('version') != MERKLE_MANIFEST_VERSION or data.get('hash_mode') != HASH_MODE_MERKLE:
+        raise ValueError(f"unsupported manifest '{manifest}'")
+    leaves = [bytes.fromhex(leaf) for leaf in data['leaves']]
+    if not leaves or merkle_root(leaves).hex() != data['root']:
+        raise ValueError(f"the chunk hashes in '{manifest}' do not match its root")
+    data['leaves'] = leaves
+    return data
+
+# --- Batch Notarization Receipts ---
+# notary_batch.py commits many notarization requests as one notarization whose file_hash
+# is the Merkle root of the requests, and gives each submitter a receipt: the request
+# plus its audit path. A receipt checks out if the path leads from the request to a root
+# that is notarized on the chain in batch mode.
+HASH_MODE_BATCH = 'batch-merkle-sha256'
+RECEIPT_VERSION = 1
+
+def batch_leaf(request):
+    """Leaf digest of one batched notarization request (its canonical JSON)."""
+    return merkle_leaf(json.dumps(request, sort_keys=True, separators=(',', ':')).encode())
+
+def receipt_root(receipt, file_hash=None):
+    """
+    The Merkle root a receipt commits to, once its audit path (and, if given, its file
+    hash) has been checked. Raises ValueError saying why the receipt does not add up.
+    """
+    if receipt.get('version') != RECEIPT_VERSION:
+        raise ValueError("unsupported receipt version")
+    request = receipt['request']
+    if file_hash is not None and request.get('file_hash') != file_hash:
+        raise ValueError("the receipt is for a different file (or the file has changed)")
+    if not verify_merkle_proof(batch_leaf(request), receipt['proof'], receipt['root']):
+        raise ValueError("the receipt's audit path does not lead to its root")
+    return receipt['root']
+
 # --- Core Classes (Block and Blockchain) ---
+# Mining: how often (in nonces, as a bit mask) to check the clock and the cancel
+# flag, and how often (in seconds) to report progress and checkpoint.
+NONCE_CHECK_MASK = 0x3ff
+PROGRESS_INTERVAL = 2.0
+
 class Block:
     def __init__(self, index, timestamp, transactions, previous_hash, nonce=0):
         self.index = index
@@ -77,9 +323,41 @@ class Block:
 
     def calculate_hash(self):
         # Using repr() for a more stable serialization of the transactions dict
+        import hashlib
         block_string = str(self.index) + str(self.timestamp) + repr(self.transactions) + str(self.previous_hash) + str(self.nonce)
         return hashlib.sha256(block_string.encode()).hexdigest()
 
+    def header(self):
+        """Returns the block's header fields (everything except the transactions)."""
+        return {
+            'index': self.index,
+            'timestamp': self.timestamp,
+            'previous_hash': self.previous_hash,
+            'nonce': self.nonce,
+            'hash': self.hash,
+        }
+
+    def to_dict(self):
+        """Converts the block into a JSON-friendly dict so it can be sent to peers."""
+        data = self.header()
+        data['transactions'] = self.transactions
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuilds a block from to_dict() output (from a peer or a chain file). The stored
+        hash is kept as-is rather than recomputed; is_valid_block() checks it when needed.
+        """
+        block = cls.__new__(cls)
+        block.index = data['index']
+        block.timestamp = data['timestamp']
+        block.transactions = data['transactions']
+        block.previous_hash = data['previous_hash']
+        block.nonce = data['nonce']
+        block.hash = data['hash']
+        return block
+
 class Blockchain:
     def __init__(self, mode='tool', coin_name='MultiCoin'):
         self.pending_transactions = []
@@ -87,9 +365,46 @@ class Blockchain:
         self.difficulty = 4
         self.mining_reward = 100
         self.coin_name = coin_name
+        # Set when old blocks have been pruned: the balances and notarizations that
+        # the missing blocks (up to and including chain[0]) add up to.
+        self.base_state = None
+        # Where pruned blocks were archived, relative to the chain file's directory
+        # (None: '<chain>.cold'; see cold_archive_filename)
+        self.cold_archive = None
+        # How block segments are compressed on disk (see save_blockchain)
+        self.storage = {'codec': 'none', 'level': None}
         # The genesis block is created when the chain is initialized
         self.chain.append(self.create_genesis_block(mode))
 
+    def __setstate__(self, state):
+        # Chain files written by older versions lack newer attributes; fill in defaults.
+        self.__dict__.update(state)
+        self.__dict__.setdefault('base_state', None)
+        self.__dict__.setdefault('storage', {'codec': 'none', 'level': None})
+        self.__dict__.setdefault('cold_archive', None)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        Bootstraps a chain from a state snapshot instead of replaying from genesis.
+        The snapshot's tip block becomes chain[0]; new blocks are mined on top of it.
+        """
+        blockchain = cls.__new__(cls)
+        blockchain.pending_transactions = []
+        blockchain.difficulty = snapshot['difficulty']
+        blockchain.mining_reward = snapshot['mining_reward']
+        blockchain.coin_name = snapshot['coin_name']
+        blockchain.base_state = {
+            'height': snapshot['height'],
+            'balances': dict(snapshot['balances']),
+            'notarizations': dict(snapshot['notarizations']),
+            'tx_count': snapshot['tx_count'],
+        }
+        blockchain.storage = {'codec': 'none', 'level': None}
+        blockchain.cold_archive = None
+        blockchain.chain = [Block.from_dict(snapshot['tip'])]
+        return blockchain
+
     def create_genesis_block(self, mode):
         print(f"Initializing blockchain in '{mode}' mode with currency '{self.coin_name}'...")
         genesis_data = {
@@ -102,23 +417,117 @@ class Blockchain:
     def get_latest_block(self):
         return self.chain[-1]
 
+    def get_block(self, index):
+        """Returns the block at a given height, or None if it is pruned or not mined yet."""
+        offset = index - self.chain[0].index
+        if 0 <= offset < len(self.chain):
+            return self.chain[offset]
+        return None
+
+    def get_blocks(self, start, count):
+        """Returns up to `count` consecutive blocks starting at height `start`."""
+        offset = max(0, start - self.chain[0].index)
+        return self.chain[offset:offset + max(0, count)]
+
+    def is_valid_block(self, block, previous_block):
+        """Checks that a block links to its parent and carries a correct Proof-of-Work."""
+        if block.index != previous_block.index + 1:
+            return False
+        if block.previous_hash != previous_block.hash:
+            return False
+        if block.timestamp < previous_block.timestamp:
+            return False
+        if not block.hash.startswith('0' * self.difficulty):
+            return False
+        return block.hash == block.calculate_hash()
+
+    def is_valid_chain(self, blocks, previous_block=None):
+        """
+        Validates a run of blocks. If previous_block is given, the run must extend it;
+        otherwise the first block is treated as a genesis block and only its hash is checked.
+        """
+        if not blocks:
+            return True
+        if previous_block is None:
+            if blocks[0].hash != blocks[0].calculate_hash():
+                return False
+            previous_block = blocks[0]
+            blocks = blocks[1:]
+        for block in blocks:
+            if not self.is_valid_block(block, previous_block):
+                return False
+            previous_block = block
+        return True
+
+    def add_block(self, block):
+        """Appends a block mined elsewhere (e.g. announced by a peer) if it extends our tip."""
+        if not self.is_valid_block(block, self.get_latest_block()):
+            return False
+        self.chain.append(block)
+        self._drop_confirmed(block.transactions)
+        return True
+
+    def replace_chain(self, fork_index, new_blocks):
+        """
+        Reorganizes the chain: everything after fork_index is swapped for new_blocks.
+        Follows the longest-valid-chain rule, so the new branch must be longer and valid.
+        Transactions from the orphaned blocks that the new branch did not confirm are
+        returned to the mempool so they are not lost.
+        """
+        if fork_index < 0:
+            # A different genesis block means a different network; only a brand new
+            # node (genesis only, nothing pending) may adopt it.
+            if len(self.chain) > 1 or self.pending_transactions:
+                return False
+            if not self.is_valid_chain(new_blocks):
+                return False
+            self.chain = list(new_blocks)
+            return True
+
+        fork_block = self.get_block(fork_index)
+        if fork_block is None:
+            return False  # The fork is older than our pruned history.
+        if fork_index + len(new_blocks) <= self.get_latest_block().index:
+            return False
+        if not self.is_valid_chain(new_blocks, fork_block):
+            return False
+
+        offset = fork_index - self.chain[0].index
+        orphaned = self.chain[offset + 1:]
+        self.chain = self.chain[:offset + 1] + list(new_blocks)
+        for block in orphaned:
+            if not isinstance(block.transactions, list):
+                continue
+            for tx in block.transactions:
+                if isinstance(tx, dict) and tx.get('type') == 'reward':
+                    continue
+                if tx not in self.pending_transactions:
+                    self.pending_transactions.append(tx)
+        for block in new_blocks:
+            self._drop_confirmed(block.transactions)
+        return True
+
+    def _drop_confirmed(self, transactions):
+        """Removes transactions that were just confirmed in a block from the mempool."""
+        if isinstance(transactions, list):
+            self.pending_transactions = [tx for tx in self.pending_transactions if tx not in transactions]
+
     def add_transaction(self, transaction):
+        if isinstance(transaction, dict) and 'txid' not in transaction:
+            transaction['txid'] = tx_id(transaction)
         self.pending_transactions.append(transaction)
 
-    def mine_pending_transactions(self, miner_address, custom_reward=None):
-        if not self.pending_transactions and (custom_reward is None or custom_reward == 0):
-             # Allow mining empty blocks if we are Minting (reward > 0), otherwise skip
-             # But wait, if we have pending transactions, we MUST mine them even if reward is 0.
-             pass
-
+    def block_template(self, miner_address, custom_reward=None):
+        """
+        Builds the next block (pending transactions plus the reward) without mining it.
+        Returns None if there is nothing to mine.
+        """
         if not self.pending_transactions:
             # If no transactions, only proceed if we are force-minting coins (reward > 0)
             if custom_reward is None or custom_reward == 0:
                 print("No pending transactions to mine.")
-                return False
+                return None
 
-        print(f"\n⛏️  Starting the miner...")
-        
         # Determine the reward amount
         reward_amount = custom_reward if custom_reward is not None else self.mining_reward
 
@@ -129,41 +538,95 @@ class Blockchain:
             reward_transaction = {
                 'type': 'reward',
                 'recipient': miner_address,
-                'amount': reward_amount
+                'amount': reward_amount,
+                # Without the height, two identical rewards would share a txid.
+                'height': self.get_latest_block().index + 1
             }
+            reward_transaction['txid'] = tx_id(reward_transaction)
             transactions_for_new_block.append(reward_transaction)
 
-        new_block = Block(
+        return Block(
             index=self.get_latest_block().index + 1,
             timestamp=time.time(),
             transactions=transactions_for_new_block,
             previous_hash=self.get_latest_block().hash
         )
 
-        self.mine_block(new_block)
+    def mine_pending_transactions(self, miner_address, custom_reward=None, template=None, **mining):
+        """
+        Mines the pending transactions into a new block and appends it. `template` is a
+        block from block_template() (e.g. one resumed from a checkpoint); `mining` is
+        passed to mine_block(). Returns False if there was nothing to mine or mining
+        stopped before a valid nonce was found.
+        """
+        new_block = template or self.block_template(miner_address, custom_reward)
+        if new_block is None:
+            return False
+
+        print(f"\n⛏️  Starting the miner...")
+        if not self.mine_block(new_block, **mining):
+            return False
         self.chain.append(new_block)
         print(f"🎉 Block #{new_block.index} successfully mined!")
-        self.pending_transactions = []
+        self._drop_confirmed(new_block.transactions)
         return True
 
-    def mine_block(self, block):
+    def mine_block(self, block, timeout=None, cancel=None, on_progress=None, progress_interval=PROGRESS_INTERVAL):
+        """
+        Searches nonces upwards from block.nonce until the hash meets the difficulty.
+        Stops early (returning False, with block.nonce at the next untried nonce) when
+        `timeout` seconds pass or the `cancel` event is set. Every `progress_interval`
+        seconds, on_progress(block, nonces_per_second) is called, e.g. to checkpoint.
+        """
+        import hashlib
         prefix = '0' * self.difficulty
-        while not block.hash.startswith(prefix):
-            block.nonce += 1
-            block.hash = block.calculate_hash()
+        # Everything but the nonce is fixed, so hash that part once and extend a copy per nonce.
+        base = hashlib.sha256((str(block.index) + str(block.timestamp) + repr(block.transactions) +
+                               str(block.previous_hash)).encode())
+        started = last_report = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        reported_nonce = nonce = block.nonce
+        while True:
+            digest = base.copy()
+            digest.update(str(nonce).encode())
+            block_hash = digest.hexdigest()
+            if block_hash.startswith(prefix):
+                break
+            nonce += 1
+            if nonce & NONCE_CHECK_MASK == 0:
+                now = time.monotonic()
+                if (deadline is not None and now >= deadline) or (cancel is not None and cancel.is_set()):
+                    block.nonce = nonce
+                    block.hash = block.calculate_hash()
+                    return False
+                if on_progress is not None and now - last_report >= progress_interval:
+                    block.nonce = nonce
+                    on_progress(block, (nonce - reported_nonce) / (now - last_report))
+                    reported_nonce, last_report = nonce, now
+        block.nonce = nonce
+        block.hash = block_hash
         print(f"Proof-of-Work successful! Nonce: {block.nonce}")
+        return True
 
     def find_hash(self, file_hash):
+        """Returns (block height, transaction) for a notarized file hash, or (None, None)."""
         for block in self.chain:
             if isinstance(block.transactions, list):
                 for tx in block.transactions:
                     if tx.get('type') == 'notarization' and tx.get('file_hash') == file_hash:
-                        return block, tx
+                        return block.index, tx
+        if self.base_state and file_hash in self.base_state['notarizations']:
+            entry = self.base_state['notarizations'][file_hash]
+            return entry['height'], dict(entry, type='notarization', file_hash=file_hash)
         return None, None
 
     def calculate_balance(self, address):
         balance = 0
-        for block in self.chain:
+        blocks = self.chain
+        if self.base_state:
+            balance = self.base_state['balances'].get(address, 0)
+            blocks = self.chain[1:]
+        for block in blocks:
             if not isinstance(block.transactions, list):
                 # The genesis block now has a dict, so we handle that
                 if isinstance(block.transactions, dict): 
@@ -180,8 +643,78 @@ class Blockchain:
                     balance += tx.get('amount', 0)
         return balance
 
+    def spendable_balance(self, address):
+        """The confirmed balance less what the address already sends in pending transactions."""
+        pending = sum(tx.get('amount', 0) for tx in self.pending_transactions
+                      if isinstance(tx, dict) and tx.get('sender') == address)
+        return self.calculate_balance(address) - pending
+
+    def compute_state(self, height):
+        """
+        Replays the chain up to and including block `height` and returns the resulting
+        state: every account balance plus the index of notarized file hashes.
+        """
+        if self.base_state:
+            balances = dict(self.base_state['balances'])
+            notarizations = dict(self.base_state['notarizations'])
+            tx_count = self.base_state['tx_count']
+            blocks = self.chain[1:]
+        else:
+            balances, notarizations, tx_count = {}, {}, 0
+            blocks = self.chain
+        for block in blocks:
+            if block.index > height:
+                break
+            if not isinstance(block.transactions, list):
+                tx_count += 1
+                continue
+            tx_count += len(block.transactions)
+            for tx in block.transactions:
+                if not isinstance(tx, dict):
+                    continue
+                # Same rules as calculate_balance()
+                if tx.get('type') == 'reward' and tx.get('recipient'):
+                    balances[tx['recipient']] = balances.get(tx['recipient'], 0) + tx.get('amount', 0)
+                if tx.get('sender'):
+                    balances[tx['sender']] = balances.get(tx['sender'], 0) - tx.get('amount', 0)
+                if tx.get('recipient') and tx.get('type') != 'reward':
+                    balances[tx['recipient']] = balances.get(tx['recipient'], 0) + tx.get('amount', 0)
+                if tx.get('type') == 'notarization':
+                    entry = notarizations.setdefault(tx['file_hash'], {
+                        'height': block.index, 'owner': tx.get('owner'),
+                        'filename': tx.get('filename'), 'timestamp': tx.get('timestamp'),
+                    })
+                    if tx.get('hash_mode') in (HASH_MODE_MERKLE, HASH_MODE_BATCH) and entry['height'] == block.index:
+                        # Keep how a Merkle root was computed, so chunks and receipts can still be verified after pruning.
+                        entry.update((k, tx[k]) for k in MERKLE_TX_FIELDS if k in tx)
+        return {'balances': balances, 'notarizations': notarizations, 'tx_count': tx_count}
+
+    def tx_count(self):
+        """Counts confirmed transactions, including those in pruned blocks."""
+        count = self.base_state['tx_count'] if self.base_state else 0
+        blocks = self.chain[1:] if self.base_state else self.chain
+        return count + sum(len(b.transactions) if isinstance(b.transactions, list) else 1 for b in blocks)
+
+    def prune(self, height):
+        """
+        Drops every block below `height` from the live chain, folding them into base_state.
+        Block `height` stays as chain[0] so new blocks still link to it.
+        Returns the removed blocks so the caller can archive them.
+        """
+        offset = height - self.chain[0].index
+        if offset <= 0:
+            return []
+        state = self.compute_state(height)
+        state['height'] = height
+        removed = self.chain[:offset]
+        self.chain = self.chain[offset:]
+        self.base_state = state
+        return removed
+
     def print_chain(self):
         print(f"\n--- ⛓️  {self.coin_name} Blockchain ⛓️  ---")
+        if self.base_state:
+            print(f"(Blocks 0-{self.chain[0].index - 1} pruned; their state is kept as a snapshot.)")
         for block in self.chain:
             print(f"Index: {block.index}")
             print(f"Timestamp: {time.ctime(block.timestamp)}")
@@ -217,17 +750,1046 @@ class Blockchain:
 
 
 # --- Persistence Functions ---
-def save_blockchain(blockchain, filename):
-    with open(filename, 'wb') as f:
-        pickle.dump(blockchain, f)
-    print(f"\nBlockchain state saved to '{filename}'")
+def load_legacy_pickle(f):
+    """
+    Legacy chain files pickle our classes under the module that saved them: '__main__'
+    when this script is run directly, 'blockchain' when imported (e.g. by node.py).
+    Resolve both to the classes defined here so either side can read the other's files.
+    """
+    import pickle
+
+    class ChainUnpickler(pickle.Unpickler):
+        def find_class(self, module, name):
+            if module in ('__main__', 'blockchain') and name in ('Block', 'Blockchain'):
+                return globals()[name]
+            return super().find_class(module, name)
 
-def load_blockchain(filename, coin_name):
+    return ChainUnpickler(f).load()
+
+# --- Segmented Block Storage ---
+# Chain files store blocks in fixed-size segments, each pickled and (optionally)
+# compressed on its own. A JSON footer indexes the segments so a single block can be
+# read by decompressing just one segment instead of inflating the whole file:
+#
+#   MAGIC | segment 0 | segment 1 | ... | meta | footer (JSON) | footer length | MAGIC
+#
+# 'meta' holds the rest of the Blockchain object (mempool, difficulty, base state...).
+# Files written by older versions are a single pickle and are still loaded as-is.
+SEGMENT_MAGIC = b'MCSEG1\n'
+SEGMENT_BLOCKS = 64
+CODECS = ('none', 'zlib', 'lzma')
+DEFAULT_LEVELS = {'none': None, 'zlib': 6, 'lzma': 6}
+_TRAILER = struct.Struct('<Q')
+
+def _compress(data, codec, level):
+    if codec == 'zlib':
+        import zlib
+        return zlib.compress(data, level)
+    if codec == 'lzma':
+        import lzma
+        return lzma.compress(data, preset=level)
+    return data
+
+def _decompress(data, codec):
+    if codec == 'zlib':
+        import zlib
+        return zlib.decompress(data)
+    if codec == 'lzma':
+        import lzma
+        return lzma.decompress(data)
+    return data
+
+def read_segment_index(f):
+    """Returns the footer of a segmented chain file, or None for a legacy pickle file."""
+    f.seek(0)
+    if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+        return None
+    tail = len(SEGMENT_MAGIC) + _TRAILER.size
+    f.seek(-tail, os.SEEK_END)
+    (footer_length,) = _TRAILER.unpack(f.read(_TRAILER.size))
+    if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+        raise ValueError("Chain file is truncated (missing segment index).")
+    f.seek(-(tail + footer_length), os.SEEK_END)
+    footer = json.loads(f.read(footer_length))
+    footer['footer_offset'] = f.tell() - footer_length
+    return footer
+
+def _read_blob(f, offset, length, codec):
+    import pickle
+    f.seek(offset)
+    return pickle.loads(_decompress(f.read(length), codec))
+
+def _read_segment(f, footer, entry):
+    # entry = [first block index, block count, offset, stored length, raw length, last block hash]
+    # (files written before saves reused segments have no last block hash)
+    return [Block.from_dict(data) for data in _read_blob(f, entry[2], entry[3], footer['codec'])]
+
+def iter_blocks(filename, start=0, end=None):
+    """
+    Yields blocks with start <= index <= end, one segment in memory at a time.
+    Segments entirely outside the range are never read or decompressed.
+    """
+    with open(filename, 'rb') as f:
+        footer = read_segment_index(f)
+        if footer is None:
+            # Legacy single-pickle file: nothing to seek, so load it whole.
+            f.seek(0)
+            blocks = load_legacy_pickle(f).chain
+            segments = [blocks]
+        else:
+            segments = (_read_segment(f, footer, entry) for entry in footer['segments']
+                        if entry[0] + entry[1] - 1 >= start and (end is None or entry[0] <= end))
+        for segment in segments:
+            for block in segment:
+                if block.index >= start and (end is None or block.index <= end):
+                    yield block
+
+def read_block(filename, height):
+    """Reads one block by height, decompressing only the segment that contains it."""
+    with open(filename, 'rb') as f:
+        footer = read_segment_index(f)
+        if footer is None:
+            f.seek(0)
+            chain = load_legacy_pickle(f).chain
+            return next((b for b in chain if b.index == height), None)
+        firsts = [entry[0] for entry in footer['segments']]
+        position = bisect.bisect_right(firsts, height) - 1
+        if position < 0:
+            return None
+        entry = footer['segments'][position]
+        for block in _read_segment(f, footer, entry):
+            if block.index == height:
+                return block
+    return None
+
+def _write_segments(f, blocks, codec, level, previous=None):
+    """
+    Writes blocks as segments and returns their footer entries. Segments end at heights
+    that are multiples of SEGMENT_BLOCKS, so a segment's contents never shift when blocks
+    are added or pruned. With `previous` (the open chain file being replaced and its footer,
+    written with the same codec and level), a segment it already holds is copied over still
+    compressed: same heights, and the same hash for the segment's last block, which (blocks
+    being hash-linked) pins every block before it. Only the rest is pickled and compressed.
+    """
+    import pickle
+    stored = {}
+    if previous:
+        stored = {(entry[0], entry[1]): entry for entry in previous[1]['segments'] if len(entry) > 5}
+    entries = []
+    i = 0
+    while i < len(blocks):
+        part = blocks[i:i + SEGMENT_BLOCKS - blocks[i].index % SEGMENT_BLOCKS]
+        i += len(part)
+        entry = stored.get((part[0].index, len(part)))
+        if entry is not None and entry[5] == part[-1].hash:
+            previous[0].seek(entry[2])
+            data = previous[0].read(entry[3])
+            raw_length = entry[4]
+        else:
+            raw = pickle.dumps([b.to_dict() for b in part], protocol=pickle.HIGHEST_PROTOCOL)
+            data = _compress(raw, codec, level)
+            raw_length = len(raw)
+        entries.append([part[0].index, len(part), f.tell(), len(data), raw_length, part[-1].hash])
+        f.write(data)
+    return entries
+
+def _open_previous_save(filename, codec, level):
+    """The existing chain file and its footer, if its segments can be reused by a save with codec/level."""
+    try:
+        f = open(filename, 'rb')
+    except OSError:
+        return None
+    try:
+        footer = read_segment_index(f)
+    except (OSError, ValueError, struct.error):
+        footer = None
+    if footer is None or footer.get('codec') != codec or footer.get('level') != level:
+        f.close()
+        return None
+    return f, footer
+
+def _write_footer(f, footer):
+    data = json.dumps(footer, separators=(',', ':')).encode()
+    f.write(data)
+    f.write(_TRAILER.pack(len(data)))
+    f.write(SEGMENT_MAGIC)
+    f.truncate()
+
+def save_blockchain(blockchain, filename, quiet=False):
+    import pickle
+    codec = blockchain.storage.get('codec', 'none')
+    level = blockchain.storage.get('level')
+    meta = {k: v for k, v in blockchain.__dict__.items() if k != 'chain'}
+    # The mempool (including anything replayed from the journal) is saved in the meta
+    # below, so the journal starts over, tagged with a fresh id that ties it to this save.
+    journal_id = os.urandom(8).hex()
+    # Write to a temporary file and rename, so a crash never leaves a half-written chain.
+    # Segments unchanged since the last save are copied from it as stored, so a save
+    # costs O(new blocks + mempool) rather than recompressing the whole chain.
+    tmp = filename + '.tmp'
+    previous = _open_previous_save(filename, codec, level)
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(SEGMENT_MAGIC)
+            segments = _write_segments(f, blockchain.chain, codec, level, previous)
+            meta_raw = pickle.dumps(meta, protocol=pickle.HIGHEST_PROTOCOL)
+            meta_data = _compress(meta_raw, codec, level)
+            meta_entry = [f.tell(), len(meta_data), len(meta_raw)]
+            f.write(meta_data)
+            tip = blockchain.get_latest_block()
+            _write_footer(f, {
+                'codec': codec, 'level': level, 'segments': segments, 'meta': meta_entry,
+                'height': tip.index + 1, 'last_hash': tip.hash,
+                'pruned_below': blockchain.chain[0].index, 'tx_count': blockchain.tx_count(),
+                'journal': journal_id, 'cold_archive': blockchain.cold_archive,
+            })
+    finally:
+        if previous:
+            previous[0].close()
+    os.replace(tmp, filename)
+    # A crash before the reset leaves a journal with the previous id, which is ignored.
+    reset_journal(filename, journal_id)
+    update_indexes(blockchain, filename)
+    if not quiet:
+        print(f"\nBlockchain state saved to '{filename}'")
+
+def load_blockchain(filename, coin_name, journal=True):
+    """Loads a chain file, replaying its mempool journal unless `journal` is False."""
     if os.path.exists(filename):
         with open(filename, 'rb') as f:
-            return pickle.load(f)
+            footer = read_segment_index(f)
+            if footer is None:
+                f.seek(0)
+                return load_legacy_pickle(f)
+            offset, length, raw_length = footer['meta']
+            blockchain = Blockchain.__new__(Blockchain)
+            blockchain.__setstate__(_read_blob(f, offset, length, footer['codec']))
+            blockchain.chain = [b for entry in footer['segments'] for b in _read_segment(f, footer, entry)]
+        if journal:
+            blockchain.pending_transactions += read_journal(filename, footer.get('journal'))[0] or []
+        return blockchain
     return Blockchain(mode='tool', coin_name=coin_name)
 
+def storage_stats(filename):
+    """
+    Summarizes a chain file from its segment index alone (no blocks are decompressed).
+    Returns None for legacy single-pickle files.
+    """
+    with open(filename, 'rb') as f:
+        footer = read_segment_index(f)
+    if footer is None:
+        return None
+    raw = sum(entry[4] for entry in footer['segments']) + footer['meta'][2]
+    stored = sum(entry[3] for entry in footer['segments']) + footer['meta'][1]
+    return {
+        'height': footer['height'], 'tx_count': footer['tx_count'], 'last_hash': footer['last_hash'],
+        'pruned_below': footer['pruned_below'], 'compression': footer['codec'],
+        'compression_ratio': round(raw / stored, 2) if stored else 1.0,
+        'file_bytes': os.path.getsize(filename),
+    }
+
+def archive_blocks(blocks, filename, codec='none', level=None):
+    """
+    Appends pruned blocks to a cold archive file, using the same segment format as chain
+    files. Heights the archive already holds are skipped: a prune that crashed after
+    archiving but before saving the pruned chain is simply run again.
+    """
+    if os.path.exists(filename):
+        with open(filename, 'r+b') as f:
+            footer = read_segment_index(f)
+            if footer['segments']:
+                first, count = footer['segments'][-1][:2]
+                blocks = [block for block in blocks if block.index >= first + count]
+            if not blocks:
+                return
+            f.seek(footer['footer_offset'])
+            footer['segments'] += _write_segments(f, blocks, footer['codec'], footer['level'])
+            footer.pop('footer_offset')
+            _write_footer(f, footer)
+    else:
+        with open(filename, 'wb') as f:
+            f.write(SEGMENT_MAGIC)
+            _write_footer(f, {'codec': codec, 'level': level, 'segments': _write_segments(f, blocks, codec, level)})
+
+def cold_archive_filename(chain_file, archive=None):
+    """
+    The chain's cold archive: `archive` as recorded by `prune --archive` (relative to the
+    chain file's directory; also kept in the chain footer), else '<chain>.cold'.
+    """
+    if archive:
+        return os.path.join(os.path.dirname(chain_file), archive)
+    return chain_file + '.cold'
+
+def iter_history(chain_file, start=0, end=None):
+    """
+    Yields confirmed blocks start..end in order, reading pruned heights from the
+    chain's cold archive and the rest from the chain file, a segment at a time.
+    """
+    pruned_below, archive = 0, None
+    with open(chain_file, 'rb') as f:
+        footer = read_segment_index(f)
+    if footer is not None:
+        pruned_below, archive = footer['pruned_below'], footer.get('cold_archive')
+    archive = cold_archive_filename(chain_file, archive)
+    if start < pruned_below and os.path.exists(archive):
+        cold_end = pruned_below - 1 if end is None else min(end, pruned_below - 1)
+        for block in iter_blocks(archive, start, cold_end):
+            yield block
+    for block in iter_blocks(chain_file, max(start, pruned_below), end):
+        yield block
+
+def read_history_block(chain_file, height):
+    """Reads one confirmed block by height, from the cold archive if it has been pruned."""
+    with open(chain_file, 'rb') as f:
+        footer = read_segment_index(f)
+    if footer is not None and height < footer['pruned_below']:
+        archive = cold_archive_filename(chain_file, footer.get('cold_archive'))
+        return read_block(archive, height) if os.path.exists(archive) else None
+    return read_block(chain_file, height)
+
+def tx_id(tx):
+    """
+    Canonical transaction id: SHA-256 of the transaction's sorted-key JSON encoding
+    (without its own 'txid' field). Transactions from before txids existed get the
+    same id they would have been assigned.
+    """
+    import hashlib
+    if isinstance(tx, dict) and 'txid' in tx:
+        tx = {k: v for k, v in tx.items() if k != 'txid'}
+    return hashlib.sha256(json.dumps(tx, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+def tx_addresses(tx):
+    """The addresses a transaction touches (sender, recipient, notarization owner)."""
+    if not isinstance(tx, dict):
+        return set()
+    return {a for a in (tx.get('sender'), tx.get('recipient'), tx.get('owner')) if a}
+
+def block_transactions(block):
+    """A block's transactions as a list (the genesis block holds a single dict)."""
+    return block.transactions if isinstance(block.transactions, list) else [block.transactions]
+
+# --- Mempool Journal ---
+# New pending transactions are appended to '<chain>.mempool' instead of rewriting the
+# chain file. Layout: JOURNAL_MAGIC | journal id (16 hex chars) '\n' | records, each
+# '<II' (payload length, CRC-32 of payload) followed by the transaction as JSON.
+# The id must match the 'journal' entry of the chain footer; the next full save folds
+# the journal into the chain's mempool and starts a new, empty one with a new id.
+JOURNAL_MAGIC = b'MCJRN1\n'
+_JOURNAL_RECORD = struct.Struct('<II')
+
+def journal_filename(chain_file):
+    return chain_file + '.mempool'
+
+# Everything that rewrites a chain file or its journal holds an exclusive flock on
+# '<chain>.lock': append_journal() for one append, and the commands that load, change
+# and save a chain (`transfer`, `prune`, ...) from the load until the save. `mine`
+# holds it to build its block and again to save it, but not while searching nonces.
+# Without it a save drops whatever is journaled meanwhile, and two saves overwrite
+# each other's blocks. The lock is re-entrant within a process.
+_held_chain_locks = {}  # lock file -> [open file, depth]
+
+class ChainLock:
+    def __init__(self, chain_file):
+        self.filename = os.path.abspath(chain_file) + '.lock'
+
+    def acquire(self):
+        import fcntl
+        held = _held_chain_locks.get(self.filename)
+        if held:
+            held[1] += 1
+            return self
+        f = open(self.filename, 'a')
+        fcntl.flock(f, fcntl.LOCK_EX)
+        _held_chain_locks[self.filename] = [f, 1]
+        return self
+
+    def release(self):
+        held = _held_chain_locks[self.filename]
+        held[1] -= 1
+        if not held[1]:
+            del _held_chain_locks[self.filename]
+            held[0].close()  # Closing the file releases the flock.
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+def _scan_journal(f, start=0):
+    """
+    Returns (journal id, transactions, end offset of the last intact record), reading
+    records from byte offset `start` (a previous end offset) or from the beginning.
+    """
+    import zlib
+    header = f.read(len(JOURNAL_MAGIC) + 17)
+    if len(header) < len(JOURNAL_MAGIC) + 17 or not header.startswith(JOURNAL_MAGIC):
+        return None, [], 0
+    journal_id = header[len(JOURNAL_MAGIC):-1].decode()
+    transactions = []
+    if start > f.tell():
+        f.seek(start)
+    good_end = f.tell()
+    while True:
+        record = f.read(_JOURNAL_RECORD.size)
+        if len(record) < _JOURNAL_RECORD.size:
+            break
+        length, checksum = _JOURNAL_RECORD.unpack(record)
+        payload = f.read(length)
+        # Records are never empty, so a zero length is a zero-filled tail (its CRC-32 would match).
+        if not length or len(payload) < length or zlib.crc32(payload) != checksum:
+            break  # Torn or corrupt tail from a crash mid-append: everything before it is intact.
+        try:
+            transactions.append(json.loads(payload))
+        except ValueError:
+            break
+        good_end = f.tell()
+    return journal_id, transactions, good_end
+
+def read_journal(chain_file, journal_id, offset=0):
+    """
+    Pending transactions journaled since the chain file was saved with `journal_id`
+    (only those after byte `offset`, if given), and the offset to continue from.
+    Returns (None, 0) if the journal belongs to a different save.
+    """
+    try:
+        with open(journal_filename(chain_file), 'rb') as f:
+            found_id, transactions, end = _scan_journal(f, offset)
+    except OSError:
+        found_id = None
+    if journal_id is None or found_id != journal_id:
+        # No journal for this save: nothing is pending, unless part of it was already read.
+        return (None, 0) if offset else ([], 0)
+    return transactions, end
+
+def reset_journal(chain_file, journal_id):
+    """Atomically replaces the journal with an empty one for the given id."""
+    filename = journal_filename(chain_file)
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(JOURNAL_MAGIC + journal_id.encode() + b'\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+def append_journal(chain_file, transaction):
+    """
+    Durably appends one pending transaction (assigning its txid) without touching the
+    chain file. Returns False if the chain file cannot take a journal yet (missing,
+    legacy, or saved before journals existed); the caller should do a full save instead.
+    """
+    with ChainLock(chain_file):
+        return _append_journal(chain_file, transaction)
+
+def _append_journal(chain_file, transaction):
+    import zlib
+    try:
+        with open(chain_file, 'rb') as f:
+            footer = read_segment_index(f)
+    except OSError:
+        return False
+    if footer is None or 'journal' not in footer:
+        return False
+    if isinstance(transaction, dict) and 'txid' not in transaction:
+        transaction['txid'] = tx_id(transaction)
+    filename = journal_filename(chain_file)
+    try:
+        with open(filename, 'rb') as f:
+            journal_id, _, good_end = _scan_journal(f)
+    except OSError:
+        journal_id = None
+    if journal_id != footer['journal']:
+        # Missing or left over from an earlier save (already folded into the chain).
+        reset_journal(chain_file, footer['journal'])
+    else:
+        with open(filename, 'r+b') as f:
+            if good_end < os.fstat(f.fileno()).st_size:
+                f.truncate(good_end)  # Drop a torn record so the new one stays readable.
+    payload = json.dumps(transaction, separators=(',', ':')).encode()
+    with open(filename, 'ab') as f:
+        f.write(_JOURNAL_RECORD.pack(len(payload), zlib.crc32(payload)) + payload)
+        f.flush()
+        os.fsync(f.fileno())
+    return True
+
+# --- Transaction Index ---
+# '<chain>.txindex' is an SQLite database (derived data; safe to delete) with:
+#   blocks(height, hash)          - which blocks have been indexed, to detect reorgs
+#   txs(txid, height, position)   - where each transaction lives
+#   postings(address, txid, ...)  - each address's transactions, in chain order
+# It is updated incrementally after every save, so lookups cost O(results), not O(chain).
+TX_INDEX_SCHEMA = 1
+
+def tx_index_filename(chain_file):
+    return chain_file + '.txindex'
+
+def open_tx_index(chain_file):
+    import sqlite3
+    conn = sqlite3.connect(tx_index_filename(chain_file), timeout=30)
+    conn.execute('CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT)')
+    row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    if row is None or int(row[0]) != TX_INDEX_SCHEMA:
+        with conn:
+            conn.executescript('''
+                DROP TABLE IF EXISTS blocks;
+                DROP TABLE IF EXISTS txs;
+                DROP TABLE IF EXISTS postings;
+                CREATE TABLE blocks(height INTEGER PRIMARY KEY, hash TEXT NOT NULL);
+                CREATE TABLE txs(txid TEXT PRIMARY KEY, height INTEGER NOT NULL, position INTEGER NOT NULL);
+                CREATE TABLE postings(address TEXT NOT NULL, txid TEXT NOT NULL, height INTEGER NOT NULL);
+                CREATE INDEX postings_by_address ON postings(address);
+            ''')
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (str(TX_INDEX_SCHEMA),))
+    return conn
+
+def _indexed_block(blockchain, chain_file, height):
+    """A block by height, from memory when we have the chain loaded, otherwise from disk."""
+    if blockchain is not None:
+        block = blockchain.get_block(height)
+        if block is not None or height >= blockchain.chain[0].index:
+            return block
+    return read_history_block(chain_file, height)
+
+def _blocks_from(blockchain, chain_file, start):
+    if blockchain is None:
+        yield from iter_history(chain_file, start)
+        return
+    first_loaded = blockchain.chain[0].index
+    archive = cold_archive_filename(chain_file, blockchain.cold_archive)
+    if start < first_loaded and os.path.exists(archive):
+        yield from iter_blocks(archive, start, first_loaded - 1)
+    yield from blockchain.get_blocks(max(start, first_loaded), blockchain.get_latest_block().index + 1)
+
+def update_tx_index(chain_file, blockchain=None):
+    """
+    Indexes any blocks added since the last update. If a reorg replaced indexed blocks,
+    their entries are dropped first. Pass the loaded blockchain to avoid re-reading the file.
+    """
+    conn = open_tx_index(chain_file)
+    try:
+        with conn:
+            row = conn.execute('SELECT MAX(height) FROM blocks').fetchone()
+            next_height = 0 if row[0] is None else row[0] + 1
+            if blockchain is not None:
+                tip_height = blockchain.get_latest_block().index
+            else:
+                with open(chain_file, 'rb') as f:
+                    tip_height = read_segment_index(f)['height'] - 1
+            # The chain file was replaced by a shorter one: forget what is past its tip.
+            rolled_back = next_height > tip_height + 1
+            next_height = min(next_height, tip_height + 1)
+            while next_height > 0:
+                (stored_hash,) = conn.execute('SELECT hash FROM blocks WHERE height = ?', (next_height - 1,)).fetchone()
+                current = _indexed_block(blockchain, chain_file, next_height - 1)
+                if current is None or current.hash == stored_hash:
+                    break  # Matches (or is pruned/unavailable and cannot contradict us).
+                next_height -= 1
+                rolled_back = True
+            if rolled_back:
+                for table in ('blocks', 'txs', 'postings'):
+                    conn.execute(f'DELETE FROM {table} WHERE height >= ?', (next_height,))
+            for block in _blocks_from(blockchain, chain_file, next_height):
+                conn.execute('INSERT OR REPLACE INTO blocks VALUES (?, ?)', (block.index, block.hash))
+                for position, tx in enumerate(block_transactions(block)):
+                    txid = tx_id(tx)
+                    conn.execute('INSERT OR IGNORE INTO txs VALUES (?, ?, ?)', (txid, block.index, position))
+                    conn.executemany('INSERT INTO postings VALUES (?, ?, ?)',
+                                     [(address, txid, block.index) for address in tx_addresses(tx)])
+    finally:
+        conn.close()
+
+def lookup_tx(chain_file, txid):
+    """Returns (height, position, transaction) for a txid, or None. Reads a single block segment."""
+    conn = open_tx_index(chain_file)
+    try:
+        row = conn.execute('SELECT height, position FROM txs WHERE txid = ?', (txid,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    block = read_history_block(chain_file, row[0])
+    return row[0], row[1], block_transactions(block)[row[1]]
+
+def address_history(chain_file, address, limit=None, before=None):
+    """
+    Returns an address's most recent transactions, newest first, as
+    (cursor, height, transaction) tuples. Pass the last cursor as `before` to page back.
+    Cost is proportional to the number of results, not the chain length.
+    """
+    conn = open_tx_index(chain_file)
+    try:
+        query = 'SELECT p.rowid, p.height, t.position FROM postings p JOIN txs t ON t.txid = p.txid WHERE p.address = ?'
+        params = [address]
+        if before is not None:
+            query += ' AND p.rowid < ?'
+            params.append(before)
+        query += ' ORDER BY p.rowid DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+    blocks = {}
+    results = []
+    for cursor, height, position in rows:
+        if height not in blocks:
+            blocks[height] = read_history_block(chain_file, height)
+        results.append((cursor, height, block_transactions(blocks[height])[position]))
+    return results
+
+def tx_index_is_current(chain_file):
+    """True if the chain's transaction index covers the chain file's current tip."""
+    if not os.path.exists(tx_index_filename(chain_file)):
+        return False
+    try:
+        with open(chain_file, 'rb') as f:
+            footer = read_segment_index(f)
+        conn = open_tx_index(chain_file)
+        try:
+            row = conn.execute('SELECT hash FROM blocks WHERE height = ?', (footer['height'] - 1,)).fetchone()
+        finally:
+            conn.close()
+    except (OSError, ValueError, TypeError):
+        return False
+    return row is not None and row[0] == footer['last_hash']
+
+# --- Time Index ---
+# '<chain>.timeindex' maps heights to block timestamps so a time window can be turned
+# into a height range with two binary searches. Layout: TIME_INDEX_MAGIC | header
+# (first height, count, hash of the last indexed block) | `count` native doubles, the
+# timestamp of each block from the first height on. Timestamps are stored as a running
+# maximum, so the array is always sorted even if a clock stepped backwards.
+TIME_INDEX_MAGIC = b'MCTIME1\n'
+_TIME_INDEX_HEADER = struct.Struct('<QQ64s')
+_TIME_INDEX_DATA = len(TIME_INDEX_MAGIC) + _TIME_INDEX_HEADER.size
+
+def time_index_filename(chain_file):
+    return chain_file + '.timeindex'
+
+def _read_time_index_header(f):
+    """Returns (first height, count, last hash) or None if the file is not a time index."""
+    data = f.read(_TIME_INDEX_DATA)
+    if len(data) < _TIME_INDEX_DATA or not data.startswith(TIME_INDEX_MAGIC):
+        return None
+    first, count, last_hash = _TIME_INDEX_HEADER.unpack(data[len(TIME_INDEX_MAGIC):])
+    return first, count, last_hash.decode()
+
+def _sorted_timestamps(blocks, floor):
+    from array import array
+    first = None
+    timestamps = array('d')
+    last_hash = None
+    for block in blocks:
+        if first is None:
+            first = block.index
+        floor = max(floor, block.timestamp)
+        timestamps.append(floor)
+        last_hash = block.hash
+    return first, timestamps, last_hash
+
+def update_time_index(chain_file, blockchain=None):
+    """
+    Appends the timestamps of blocks added since the last update. If the last indexed
+    block is no longer on the chain (a reorg), the index is rebuilt from scratch. The
+    new index is written to a temp file and renamed over the old one. Callers hold the
+    ChainLock (save_blockchain's callers do).
+    """
+    from array import array
+    filename = time_index_filename(chain_file)
+    if blockchain is not None:
+        tip = blockchain.get_latest_block()
+        tip_height, tip_hash = tip.index, tip.hash
+    else:
+        with open(chain_file, 'rb') as f:
+            footer = read_segment_index(f)
+        tip_height, tip_hash = footer['height'] - 1, footer['last_hash']
+
+    header = None
+    indexed = b''
+    if os.path.exists(filename):
+        with open(filename, 'rb') as f:
+            header = _read_time_index_header(f)
+            if header and header[1]:
+                indexed = f.read(header[1] * 8)
+                if len(indexed) < header[1] * 8:
+                    header = None  # Truncated: rebuild it.
+    if header and header[1]:
+        first, count, last_hash = header
+        last_height = first + count - 1
+        if last_height == tip_height and last_hash == tip_hash:
+            return  # Already current.
+        if last_height <= tip_height:
+            block = _indexed_block(blockchain, chain_file, last_height)
+            if block is not None and block.hash == last_hash:
+                _, timestamps, new_last_hash = _sorted_timestamps(
+                    _blocks_from(blockchain, chain_file, last_height + 1), array('d', indexed[-8:])[0])
+                _write_time_index(filename, first, count + len(timestamps), new_last_hash,
+                                  indexed + timestamps.tobytes())
+                return
+
+    first, timestamps, last_hash = _sorted_timestamps(_blocks_from(blockchain, chain_file, 0), float('-inf'))
+    _write_time_index(filename, first or 0, len(timestamps), last_hash or '', timestamps.tobytes())
+
+def _write_time_index(filename, first, count, last_hash, data):
+    # A temp file and a rename, as for chain files: readers never see a half-written index.
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(TIME_INDEX_MAGIC)
+        f.write(_TIME_INDEX_HEADER.pack(first, count, last_hash.encode()))
+        f.write(data)
+    os.replace(tmp, filename)
+
+def heights_between(chain_file, since=None, until=None):
+    """
+    Returns (first, last) heights of the blocks timestamped within [since, until], or
+    None if there are none. Two binary searches over the memory-mapped time index, so
+    only a handful of its pages are ever read.
+    """
+    import mmap
+    with open(time_index_filename(chain_file), 'rb') as f:
+        header = _read_time_index_header(f)
+        if header is None or header[1] == 0:
+            return None
+        first, count, _ = header
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as buf, buf[_TIME_INDEX_DATA:_TIME_INDEX_DATA + count * 8] as raw, raw.cast('d') as timestamps:
+                low = bisect.bisect_left(timestamps, since) if since is not None else 0
+                high = bisect.bisect_right(timestamps, until) if until is not None else count
+    if low >= high:
+        return None
+    return first + low, first + high - 1
+
+# --- Bloom Filter of Notarized File Hashes ---
+# Each chain keeps a '<chain>.bloom' sidecar. Asking it whether a file hash was
+# notarized answers either "definitely not" or "maybe", without touching block data,
+# so verifying across many chains only has to scan the few that might match.
+BLOOM_MAGIC = b'MCBLM1\n'
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+BLOOM_MIN_CAPACITY = 1024
+
+class BloomFilter:
+    def __init__(self, capacity, bits=None, hashes=None, data=None):
+        import math
+        self.capacity = capacity
+        # Optimal size for the target false-positive rate: m = -n ln p / (ln 2)^2, k = (m/n) ln 2
+        self.bits = bits or max(8, int(-capacity * math.log(BLOOM_FALSE_POSITIVE_RATE) / (math.log(2) ** 2)))
+        self.hashes = hashes or max(1, round(self.bits / capacity * math.log(2)))
+        self.data = bytearray(data) if data is not None else bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Items are SHA-256 hex digests, which are already uniformly random, so two
+        # 64-bit slices of the digest drive double hashing without hashing again.
+        h1 = int(item[:16], 16)
+        h2 = int(item[16:32], 16) | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.data[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.data[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+def bloom_filename(chain_file):
+    return chain_file + '.bloom'
+
+def read_bloom(chain_file):
+    """Returns (BloomFilter, header) for a chain, or (None, None) if there is no usable filter."""
+    try:
+        with open(bloom_filename(chain_file), 'rb') as f:
+            if f.read(len(BLOOM_MAGIC)) != BLOOM_MAGIC:
+                return None, None
+            (header_length,) = _TRAILER.unpack(f.read(_TRAILER.size))
+            header = json.loads(f.read(header_length))
+            bloom = BloomFilter(header['capacity'], header['bits'], header['hashes'], f.read())
+            bloom.count = header['count']
+            return bloom, header
+    except (OSError, ValueError, KeyError, struct.error):
+        return None, None
+
+def _write_bloom(chain_file, bloom, height, last_hash):
+    header = json.dumps({
+        'capacity': bloom.capacity, 'bits': bloom.bits, 'hashes': bloom.hashes,
+        'count': bloom.count, 'height': height, 'last_hash': last_hash,
+    }).encode()
+    tmp = bloom_filename(chain_file) + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(BLOOM_MAGIC)
+        f.write(_TRAILER.pack(len(header)))
+        f.write(header)
+        f.write(bloom.data)
+    os.replace(tmp, bloom_filename(chain_file))
+
+def _notarized_hashes(blocks):
+    for block in blocks:
+        if isinstance(block.transactions, list):
+            for tx in block.transactions:
+                if isinstance(tx, dict) and tx.get('type') == 'notarization':
+                    yield tx['file_hash']
+
+def update_bloom(blockchain, chain_file):
+    """
+    Brings a chain's Bloom filter up to date. Normally only the blocks mined since
+    the last update are added; after a reorg, or once the filter is over capacity,
+    it is rebuilt from the chain (plus the notarizations of any pruned blocks).
+    """
+    tip = blockchain.get_latest_block()
+    bloom, header = read_bloom(chain_file)
+    if bloom is not None:
+        indexed = blockchain.get_block(header['height'])
+        if indexed is not None and indexed.hash == header['last_hash']:
+            for file_hash in _notarized_hashes(blockchain.get_blocks(header['height'] + 1, tip.index)):
+                bloom.add(file_hash)
+            if bloom.count <= bloom.capacity:
+                _write_bloom(chain_file, bloom, tip.index, tip.hash)
+                return bloom
+
+    hashes = list(blockchain.base_state['notarizations']) if blockchain.base_state else []
+    hashes += _notarized_hashes(blockchain.chain)
+    bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * len(hashes)))
+    for file_hash in hashes:
+        bloom.add(file_hash)
+    _write_bloom(chain_file, bloom, tip.index, tip.hash)
+    return bloom
+
+def update_indexes(blockchain, chain_file):
+    """Refreshes every sidecar index of a chain file after it has been saved."""
+    update_bloom(blockchain, chain_file)
+    update_tx_index(chain_file, blockchain)
+    update_time_index(chain_file, blockchain)
+
+# --- Multi-Chain Verification ---
+def bloom_says_absent(chain_file, file_hash):
+    """
+    True only if the chain's Bloom filter is current (it matches the chain file's tip)
+    and rules the hash out. A missing or stale filter means the chain must be scanned.
+    """
+    bloom, header = read_bloom(chain_file)
+    if bloom is None:
+        return False
+    try:
+        with open(chain_file, 'rb') as f:
+            footer = read_segment_index(f)
+    except (OSError, ValueError):
+        return False
+    if footer is None or footer.get('last_hash') != header['last_hash']:
+        return False
+    return file_hash not in bloom
+
+def scan_chain_for_hash(chain_file, file_hash):
+    """
+    Loads one chain and looks the hash up. Runs in a worker process. Read-only: a
+    missing or stale filter is rebuilt by the next command that saves the chain.
+    Returns (chain, height, tx, error); error is set if the file is not a readable chain.
+    """
+    try:
+        with open(chain_file, 'rb') as f:
+            footer = read_segment_index(f)
+        if footer is not None and 'meta' not in footer:
+            return chain_file, None, None, 'a cold archive, not a chain file'
+        blockchain = load_blockchain(chain_file, 'MultiCoin')
+    except Exception as e:
+        # Any .dat file may turn up in --chain-dir; one bad file must not stop the others.
+        return chain_file, None, None, f"unreadable ({type(e).__name__}: {e})"
+    height, tx = blockchain.find_hash(file_hash)
+    return chain_file, height, tx, None
+
+def verify_across_chains(chain_files, file_hash, workers=None):
+    """
+    Looks a file hash up in many chains at once. Bloom filters are checked in parallel
+    threads; only chains that might contain the hash are loaded, in parallel processes.
+    Returns (matches as [(chain, height, tx)], number of chains ruled out by Bloom filters,
+    skipped files as [(chain, reason)]).
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers or 16) as pool:
+        absent = list(pool.map(lambda c: bloom_says_absent(c, file_hash), chain_files))
+    candidates = [c for c, ruled_out in zip(chain_files, absent) if not ruled_out]
+    matches, skipped = [], []
+    if candidates:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chain_file, height, tx, error in pool.map(scan_chain_for_hash, candidates,
+                                                          [file_hash] * len(candidates)):
+                if error:
+                    skipped.append((chain_file, error))
+                elif height is not None:
+                    matches.append((chain_file, height, tx))
+    return matches, len(chain_files) - len(candidates), skipped
+
+# --- Streaming Export ---
+EXPORT_FORMATS = ('jsonl', 'csv')
+EXPORT_CSV_FIELDS = ['height', 'block_hash', 'block_timestamp', 'tx_index', 'txid', 'type',
+                     'sender', 'recipient', 'amount', 'owner', 'filename', 'file_hash', 'timestamp']
+
+def parse_time(value):
+    """Accepts Unix seconds ('1763930659') or an ISO date/time ('2025-11-23', '2025-11-23T14:00')."""
+    try:
+        return float(value)
+    except ValueError:
+        from datetime import datetime
+        return datetime.fromisoformat(value).timestamp()
+
+def export_rows(chain_file, from_height=0, to_height=None, since=None, until=None, types=None):
+    """
+    Yields one flat dict per confirmed transaction, block by block, so memory use does
+    not depend on chain length. Block timestamps never decrease, so the scan stops at
+    the first block past `until`.
+    """
+    for block in iter_history(chain_file, from_height, to_height):
+        if since is not None and block.timestamp < since:
+            continue
+        if until is not None and block.timestamp > until:
+            break
+        transactions = block.transactions if isinstance(block.transactions, list) else [block.transactions]
+        for position, tx in enumerate(transactions):
+            if isinstance(tx, dict):
+                row = dict(tx)
+                row.setdefault('type', 'currency')
+            else:
+                row = {'type': 'data', 'data': tx}
+            if types and row['type'] not in types:
+                continue
+            # Transactions from before txids existed get the id `tx` looks them up by.
+            row.setdefault('txid', tx_id(tx))
+            row.update(height=block.index, block_hash=block.hash,
+                       block_timestamp=block.timestamp, tx_index=position)
+            yield row
+
+def write_export(rows, fmt, out):
+    """Writes rows to an open text stream as JSON Lines or CSV; returns the row count."""
+    count = 0
+    if fmt == 'csv':
+        import csv
+        writer = csv.DictWriter(out, fieldnames=EXPORT_CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            out.write(json.dumps(row, separators=(',', ':')) + '\n')
+            count += 1
+    return count
+
+# --- Usage Reports ---
+# Credits paid to the cluster's billing address (scheduler.py's ADMIN_ADDRESS).
+BILLING_ADDRESS = 'HPC_Core'
+
+def usage_report(chain_file, since=None, until=None, recipient=BILLING_ADDRESS, by_user=False):
+    """
+    Totals the currency payments to `recipient` in blocks timestamped within [since, until].
+    The time index narrows the window to a height range first, so only blocks inside it
+    are read, however long the chain is.
+    """
+    report = {'since': since, 'until': until, 'recipient': recipient, 'first_height': None,
+              'last_height': None, 'blocks': 0, 'payments': 0, 'credits': 0}
+    if by_user:
+        report['by_user'] = {}
+    heights = heights_between(chain_file, since, until)
+    if heights is None:
+        return report
+    report['first_height'], report['last_height'] = heights
+    for block in iter_history(chain_file, heights[0], heights[1]):
+        if (since is not None and block.timestamp < since) or (until is not None and block.timestamp > until):
+            continue  # Only possible if a clock stepped backwards (see the time index).
+        report['blocks'] += 1
+        for tx in block_transactions(block):
+            if not isinstance(tx, dict) or tx.get('type', 'currency') != 'currency' or tx.get('recipient') != recipient:
+                continue
+            report['payments'] += 1
+            report['credits'] += tx.get('amount', 0)
+            if by_user:
+                user = report['by_user'].setdefault(tx.get('sender'), {'payments': 0, 'credits': 0})
+                user['payments'] += 1
+                user['credits'] += tx.get('amount', 0)
+    return report
+
+# --- State Snapshots ---
+SNAPSHOT_VERSION = 1
+
+def snapshot_hash(snapshot):
+    """Commits to every field of a snapshot (except the commitment itself) via a canonical encoding."""
+    import hashlib
+    body = {k: v for k, v in snapshot.items() if k != 'state_hash'}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+def write_snapshot(blockchain, height, filename):
+    """Writes the balances, notarization index and tip block at `height` to a JSON snapshot."""
+    tip = blockchain.get_block(height)
+    if tip is None:
+        raise ValueError(f"Block #{height} is not available on this chain.")
+    state = blockchain.compute_state(height)
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'coin_name': blockchain.coin_name,
+        'difficulty': blockchain.difficulty,
+        'mining_reward': blockchain.mining_reward,
+        'height': height,
+        'tip': tip.to_dict(),
+        'balances': state['balances'],
+        'notarizations': state['notarizations'],
+        'tx_count': state['tx_count'],
+    }
+    snapshot['state_hash'] = snapshot_hash(snapshot)
+    with open(filename, 'w') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+    return snapshot
+
+def read_snapshot(filename):
+    """Loads a snapshot and checks its commitment and tip block; raises ValueError if tampered."""
+    with open(filename, 'r') as f:
+        snapshot = json.load(f)
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {snapshot.get('version')}")
+    if snapshot_hash(snapshot) != snapshot.get('state_hash'):
+        raise ValueError("Snapshot state hash does not match its contents.")
+    tip = Block.from_dict(snapshot['tip'])
+    if tip.hash != tip.calculate_hash() or tip.index != snapshot['height']:
+        raise ValueError("Snapshot tip block is corrupt.")
+    return snapshot
+
+# --- Mining Checkpoints ---
+# While `mine` runs, the block template under work and the next untried nonce are
+# saved to '<chain>.mining'. A later `mine` building the same template (same parent,
+# transactions and difficulty) continues from that nonce instead of starting over.
+MINING_CHECKPOINT_VERSION = 1
+# Exit status of `mine` when it stops (timeout or cancel) before finding a nonce.
+EXIT_MINING_INTERRUPTED = 3
+
+def mining_checkpoint_filename(chain_file):
+    return chain_file + '.mining'
+
+def write_mining_checkpoint(block, difficulty, filename):
+    checkpoint = {'version': MINING_CHECKPOINT_VERSION, 'difficulty': difficulty,
+                  'updated': time.time(), 'block': block.to_dict()}
+    tmp = filename + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, filename)
+
+def resume_mining_checkpoint(block, difficulty, filename):
+    """
+    If the checkpoint holds this same block template, moves `block` to the saved
+    timestamp and nonce and returns True. Stale or unreadable checkpoints are ignored.
+    """
+    try:
+        with open(filename, 'r') as f:
+            checkpoint = json.load(f)
+        saved = checkpoint['block']
+        if (checkpoint.get('version') != MINING_CHECKPOINT_VERSION or checkpoint['difficulty'] != difficulty
+                or saved['index'] != block.index or saved['previous_hash'] != block.previous_hash
+                or saved['transactions'] != block.transactions):
+            return False
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    block.timestamp = saved['timestamp']
+    block.nonce = saved['nonce']
+    block.hash = block.calculate_hash()
+    return True
+
 # --- Different Workflow Functions ---
 def run_original_demo():
     print("--- Running Original Simple Demo ---")
@@ -279,17 +1841,295 @@ def run_self_verify():
     else:
         print("\n🚨 WARNING: Verification Failed! The script may have been tampered with.")
 
-# --- Main CLI Function ---
-def main():
-    if len(sys.argv) == 1:
-        run_original_demo()
+def hash_file_for(args):
+    """
+    The hash of args.filepath to notarize or look up: plain SHA-256, or with --merkle the
+    Merkle root of its chunks (`verify` also picks Merkle mode when the file has a
+    manifest). Returns (file_hash, hash fields for a notarization), or (None, None).
+    """
+    manifest = args.manifest or merkle_manifest_filename(args.filepath)
+    if args.command == 'verify' and not args.merkle and os.path.exists(manifest):
+        args.merkle = True
+    if not args.merkle:
+        return hash_file(args.filepath), {'hash_mode': HASH_MODE_SHA256}
+    chunk_size = args.chunk_size << 20 if args.chunk_size else None
+    if chunk_size is None and args.command == 'verify' and os.path.exists(manifest):
+        try:
+            with open(manifest, 'r') as f:
+                chunk_size = json.load(f)['chunk_size']
+        except (OSError, ValueError, KeyError):
+            pass
+    chunk_size = chunk_size or MERKLE_CHUNK_SIZE
+    root, leaves = hash_file_merkle(args.filepath, chunk_size, args.workers)
+    if root is None:
+        return None, None
+    if args.command == 'notarize':
+        try:
+            print(f"🌳 Merkle root of {len(leaves)} chunks; chunk hashes written to "
+                  f"'{write_merkle_manifest(args.filepath, root, leaves, chunk_size, args.manifest)}'.")
+        except OSError as e:
+            print(f"⚠️  Could not write the chunk manifest ({e}); single chunks cannot be verified.")
+    return root, {'hash_mode': HASH_MODE_MERKLE, 'chunk_size': chunk_size, 'chunks': len(leaves),
+                  'file_size': os.path.getsize(args.filepath)}
+
+def run_chunk_verify(blockchain, args):
+    """
+    Checks single chunks of a Merkle-notarized file against the root on the chain, using
+    the chunk hashes in its manifest: only the requested chunks are read and hashed.
+    """
+    manifest_file = args.manifest or merkle_manifest_filename(args.filepath)
+    try:
+        manifest = read_merkle_manifest(manifest_file)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Cannot use the chunk manifest: {e}")
         return
+    height, tx = blockchain.find_hash(manifest['root'])
+    if height is None:
+        print(f"\n--- Verification Failed---\n❌ The manifest's Merkle root is not on the blockchain.")
+        return
+    leaves, chunk_size = manifest['leaves'], manifest['chunk_size']
+    if (tx.get('hash_mode'), tx.get('chunk_size'), tx.get('chunks')) != (HASH_MODE_MERKLE, chunk_size, len(leaves)):
+        print(f"\n--- Verification Failed---\n❌ Block #{height} does not record this manifest's chunking.")
+        return
+    bad = [n for n in args.chunks if not 0 <= n < len(leaves)]
+    if bad:
+        print(f"❌ No chunk {bad[0]}: the file was notarized as chunks 0-{len(leaves) - 1}.")
+        return
+    if not os.path.exists(args.filepath):
+        print(f"Error: File not found at '{args.filepath}'")
+        return
+    print(f"Merkle root found in Block #{height} ({len(leaves)} chunks of {chunk_size >> 20} MiB).")
+    for n, leaf in zip(args.chunks, hash_chunks(args.filepath, chunk_size, args.chunks, args.workers)):
+        if verify_merkle_proof(leaf, merkle_proof(leaves, n), tx['file_hash']):
+            print(f"✅ Chunk {n} matches the notarized root.")
+        else:
+            print(f"❌ Chunk {n} does not match: bytes {n * chunk_size}-{(n + 1) * chunk_size - 1} differ or are missing.")
 
-    parser = argparse.ArgumentParser(
-        description='''MultiCoin: A Multi-Mode Educational Blockchain Tool.
-This tool demonstrates blockchain concepts through three distinct modes of operation.''',
-        formatter_class=argparse.RawTextHelpFormatter,
-        epilog='''
+def load_receipt_root(args):
+    """Reads args.receipt and returns the root it commits to (or None, having said why not)."""
+    file_hash = None
+    if args.filepath:
+        file_hash = hash_file(args.filepath)
+        if not file_hash:
+            return None
+    try:
+        with open(args.receipt, 'r') as f:
+            return receipt_root(json.load(f), file_hash)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"\n--- Verification Failed---\n❌ Invalid receipt: {e}")
+        return None
+
+def run_receipt_verify(blockchain, args):
+    """Checks a batch notarization receipt (and optionally the file it is for) against the chain."""
+    root = load_receipt_root(args)
+    if root is None:
+        return
+    height, tx = blockchain.find_hash(root)
+    if height is not None and tx.get('hash_mode') == HASH_MODE_BATCH:
+        print(f"\n--- Verification Successful!---\n✅ Receipt checks out: its batch "
+              f"({tx.get('batch_size')} requests) was notarized in Block #{height}.")
+    elif any(tx.get('file_hash') == root for tx in blockchain.pending_transactions):
+        print(f"\n⏳ The receipt's batch is committed but not mined yet. Run `mine`, then verify again.")
+    else:
+        print(f"\n--- Verification Failed---\n❌ The receipt's batch root is not in the blockchain.")
+
+def run_multi_chain_verify(args):
+    """Verifies one file against several chains (given with --chain and/or --chain-dir)."""
+    chain_files = list(args.chains or [])
+    if args.chain_dir:
+        chain_files += sorted(os.path.join(args.chain_dir, name) for name in os.listdir(args.chain_dir)
+                              if name.endswith('.dat'))
+    chain_files = [c for c in dict.fromkeys(chain_files) if os.path.exists(c)]
+    if not chain_files:
+        print("❌ No chain files found to check.")
+        return
+    if args.receipt:
+        file_hash = load_receipt_root(args)
+    else:
+        file_hash, _ = hash_file_for(args)
+    if not file_hash:
+        return
+    started = time.time()
+    matches, ruled_out, skipped = verify_across_chains(chain_files, file_hash, args.workers)
+    elapsed = (time.time() - started) * 1000
+    print(f"Checked {len(chain_files)} chains in {elapsed:.1f} ms "
+          f"({ruled_out} ruled out by Bloom filter, {len(chain_files) - ruled_out - len(skipped)} scanned).")
+    for chain_file, reason in skipped:
+        print(f"⚠️  Skipped '{chain_file}': {reason}.")
+    if matches:
+        print("\n--- Verification Successful!---")
+        for chain_file, height, tx in matches:
+            print(f"✅ File hash found in '{chain_file}' in Block #{height}.")
+    else:
+        print(f"\n--- Verification Failed---\n❌ File hash not found in any of the chains.")
+
+def load_cli_chain(args):
+    """Loads the --chain file for a CLI command, applying --compress/--compress-level if given."""
+    blockchain = load_blockchain(args.chain, args.coin_name)
+    if args.compress is not None:
+        level = args.compress_level if args.compress_level is not None else DEFAULT_LEVELS[args.compress]
+        blockchain.storage = {'codec': args.compress, 'level': level}
+    return blockchain
+
+def run_mine(args):
+    """
+    Mines the pending transactions with an optional time limit and progress report,
+    checkpointing the nonce so an interrupted run can be resumed. SIGINT/SIGTERM stop
+    mining cleanly; an interrupted run exits with EXIT_MINING_INTERRUPTED.
+    Returns True if a block was mined, False if there was nothing to mine.
+
+    The chain lock is only held to build the block and to save it, not during the
+    nonce search, so transactions are admitted meanwhile. The save reloads the chain
+    (with whatever was journaled since) and only appends the block if the tip has not
+    moved; otherwise mining starts over on the new tip.
+    """
+    import signal
+    import threading
+    checkpoint = mining_checkpoint_filename(args.chain)
+    deadline = time.monotonic() + args.timeout if args.timeout is not None else None
+    cancel = threading.Event()
+    previous_handlers = {sig: signal.signal(sig, lambda signum, frame: cancel.set())
+                         for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        while True:
+            with ChainLock(args.chain):
+                blockchain = load_cli_chain(args)
+                template = blockchain.block_template(args.address, args.reward)
+                if template is None:
+                    # Still saved, so a new, legacy or recompressed chain file is rewritten.
+                    save_blockchain(blockchain, args.chain)
+                    return False
+                if not os.path.exists(args.chain):
+                    # A new chain: save its genesis block, or the reload below would make another.
+                    save_blockchain(blockchain, args.chain, quiet=True)
+            if resume_mining_checkpoint(template, blockchain.difficulty, checkpoint):
+                print(f"⏯️  Resuming Block #{template.index} from nonce {template.nonce:,}.")
+
+            def on_progress(block, rate):
+                write_mining_checkpoint(block, blockchain.difficulty, checkpoint)
+                if args.progress:
+                    print(f"   ⛏️  nonce {block.nonce:,} | {rate:,.0f} nonces/sec", flush=True)
+
+            timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            started = time.monotonic()
+            first_nonce = template.nonce
+            mined = blockchain.mine_pending_transactions(args.address, template=template, timeout=timeout,
+                                                         cancel=cancel, on_progress=on_progress)
+            elapsed = time.monotonic() - started
+            if args.progress and elapsed > 0:
+                print(f"   ⛏️  {template.nonce - first_nonce:,} nonces in {elapsed:.1f}s "
+                      f"({(template.nonce - first_nonce) / elapsed:,.0f} nonces/sec)")
+            if not mined:
+                write_mining_checkpoint(template, blockchain.difficulty, checkpoint)
+                reason = 'cancelled' if cancel.is_set() else f"timed out after {args.timeout}s"
+                print(f"⏸️  Mining {reason} at nonce {template.nonce:,}. Run `mine` again to resume.")
+                # Nothing changed on the chain (the checkpoint holds the work done), so exit without saving.
+                sys.exit(EXIT_MINING_INTERRUPTED)
+            with ChainLock(args.chain):
+                blockchain = load_cli_chain(args)
+                if blockchain.add_block(template):
+                    if os.path.exists(checkpoint):
+                        os.remove(checkpoint)
+                    save_blockchain(blockchain, args.chain)
+                    return True
+            print(f"↪️  Block #{template.index} was added by another miner meanwhile; mining on the new tip.")
+    finally:
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+
+def run_export(args):
+    """Streams the chain (including its cold archive) to a file or stdout without loading it."""
+    if not os.path.exists(args.chain):
+        print(f"❌ Chain file '{args.chain}' not found.", file=sys.stderr)
+        sys.exit(1)
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        print(f"❌ Invalid time: {e}", file=sys.stderr)
+        sys.exit(1)
+    types = {t for value in args.types for t in value.split(',')} if args.types else None
+    rows = export_rows(args.chain, args.from_height, args.to_height, since, until, types)
+    if args.out == '-':
+        try:
+            write_export(rows, args.format, sys.stdout)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader (e.g. `head`) stopped early; that is not an error.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
+    with open(args.out, 'w', newline='') as out:
+        count = write_export(rows, args.format, out)
+    print(f"📤 Exported {count} transactions to '{args.out}'.")
+
+def describe_tx(tx):
+    """One-line summary of a transaction for the history listing."""
+    kind = tx.get('type', '?')
+    if kind == 'notarization':
+        return f"notarization  {tx.get('owner')}  {tx.get('filename')}  {str(tx.get('file_hash'))[:16]}..."
+    if kind == 'reward':
+        return f"reward        -> {tx.get('recipient')}  {tx.get('amount')}"
+    return f"{kind:<13} {tx.get('sender')} -> {tx.get('recipient')}  {tx.get('amount')}"
+
+def run_tx_lookup(args):
+    """Prints one transaction by txid using the chain's transaction index."""
+    found = lookup_tx(args.chain, args.txid)
+    if found is None:
+        print(f"❌ Transaction '{args.txid}' not found.")
+        sys.exit(1)
+    height, position, tx = found
+    print(f"🔎 Transaction {args.txid} is #{position} in Block #{height}:")
+    print(json.dumps(tx, indent=2, sort_keys=True))
+
+def run_history(args):
+    """Prints an address's most recent transactions, newest first, using the transaction index."""
+    entries = address_history(args.chain, args.address, args.limit)
+    if not entries:
+        print(f"No transactions found for address '{args.address}'.")
+        return
+    print(f"📜 Last {len(entries)} transactions for '{args.address}' (newest first):")
+    for _, height, tx in entries:
+        print(f"  #{height:<6} {tx_id(tx)[:16]}  {describe_tx(tx)}")
+
+def run_usage(args):
+    """Prints the credits paid to the billing address in a time window, optionally per user."""
+    if not os.path.exists(args.chain):
+        print(f"❌ Chain file '{args.chain}' not found.")
+        sys.exit(1)
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        print(f"❌ Invalid time: {e}")
+        sys.exit(1)
+    with ChainLock(args.chain):
+        # Under the lock, so the index is not updated while a save replaces the chain.
+        with open(args.chain, 'rb') as f:
+            footer = read_segment_index(f)
+        if footer is None:
+            # Legacy chain file: rewriting it in the segmented format also builds its indexes.
+            save_blockchain(load_blockchain(args.chain, args.coin_name), args.chain, quiet=True)
+        else:
+            update_time_index(args.chain)
+    report = usage_report(args.chain, since, until, args.recipient, by_user=args.by == 'user')
+    if args.json:
+        print(json.dumps(report))
+        return
+    window = f"{args.since or 'the beginning'} to {args.until or 'now'}"
+    if report['first_height'] is None:
+        print(f"No blocks between {window}.")
+        return
+    print(f"🧾 Usage from {window} (Blocks #{report['first_height']}-#{report['last_height']}):")
+    print(f"   {report['payments']} payments, {report['credits']} credits paid to {args.recipient}")
+    if args.by == 'user':
+        for user, totals in sorted(report['by_user'].items(), key=lambda item: -item[1]['credits']):
+            print(f"   {str(user):<20} {totals['credits']:>10} credits  ({totals['payments']} payments)")
+
+# --- Command Line Interface ---
+CLI_DESCRIPTION = '''MultiCoin: A Multi-Mode Educational Blockchain Tool.
+This tool demonstrates blockchain concepts through three distinct modes of operation.'''
+
+CLI_EPILOG = '''
 --- EXAMPLES ---
 
 **1. Default Mode (Simple Demo):**
@@ -324,44 +2164,176 @@ This tool demonstrates blockchain concepts through three distinct modes of opera
    # Verify the file on your new chain
    $ ./blockchain.py --chain ivxx_chain.dat verify "my_notes.txt"
 '''
+
+# --- Subcommand Arguments ---
+# Each function adds one subcommand's arguments. build_parser() only calls the one
+# for the command being run (see COMMANDS below).
+
+def add_merkle_args(p):
+    p.add_argument('--merkle', action='store_true',
+                   help='Hash the file as a Merkle tree of fixed-size chunks, in parallel (for very large files).')
+    p.add_argument('--chunk-size', type=int, default=None,
+                   help=f'Merkle chunk size in MiB (default {MERKLE_CHUNK_SIZE >> 20}).')
+    p.add_argument('--manifest', type=str, default=None,
+                   help='Chunk hash manifest of a Merkle-hashed file (defaults to <file>.merkle).')
+
+def add_notarize_args(p):
+    p.add_argument('--owner', type=str, required=True, help='The name of the file owner.')
+    p.add_argument('--file', type=str, required=True, dest='filepath', help='The path to the file to notarize.')
+    add_merkle_args(p)
+    p.add_argument('--workers', type=int, default=None, help='Processes hashing chunks in parallel (--merkle).')
+
+def add_mine_args(p):
+    p.add_argument('--miner', type=str, dest='address', default=os.environ.get('USER', 'local_miner'),
+                   help='The address to receive the mining reward (defaults to your system username).')
+    p.add_argument('--reward', type=int, default=None, help='Override the default mining reward (use 0 to disable inflation).')
+    p.add_argument('--timeout', type=float, default=None,
+                   help='Stop after this many seconds; the next `mine` resumes from the checkpointed nonce.')
+    p.add_argument('--progress', action='store_true', help='Report the current nonce and nonces/sec while mining.')
+
+def add_verify_args(p):
+    p.add_argument('filepath', type=str, nargs='?', default=None,
+                   help='The path to the file to verify (optional with --receipt).')
+    p.add_argument('--receipt', type=str, default=None,
+                   help='Check this batch notarization receipt (from notary_batch.py) against the chain.')
+    p.add_argument('--chain', type=str, action='append', dest='chains', default=None,
+                   help='Check this chain file (repeat to check several chains in parallel).')
+    p.add_argument('--chain-dir', type=str, default=None,
+                   help='Check every *.dat chain file in this directory in parallel.')
+    p.add_argument('--workers', type=int, default=None, help='Parallel workers for multi-chain verify and chunk hashing.')
+    add_merkle_args(p)
+    p.add_argument('--chunk', type=int, action='append', dest='chunks', default=None,
+                   help='Check only this chunk of a Merkle-notarized file against its root (repeatable).')
+
+def add_snapshot_args(p):
+    p.add_argument('--height', type=int, default=None, help='Block height to snapshot (defaults to the tip).')
+    p.add_argument('--out', type=str, default=None, help='Snapshot file to write (defaults to <chain>.snapshot).')
+
+def add_prune_args(p):
+    p.add_argument('--snapshot', type=str, required=True, help='Snapshot file marking the prune height.')
+    p.add_argument('--archive', type=str, default=None, help='Cold archive file to append to (defaults to <chain>.cold; remembered by the chain).')
+
+def add_bootstrap_args(p):
+    p.add_argument('--snapshot', type=str, required=True, help='Snapshot file to start from.')
+
+def add_export_args(p):
+    p.add_argument('--format', type=str, choices=EXPORT_FORMATS, default='jsonl', help='Output format (default: jsonl).')
+    p.add_argument('--out', type=str, default='-', help='Output file (default: stdout).')
+    p.add_argument('--from-height', type=int, default=0, help='First block height to export.')
+    p.add_argument('--to-height', type=int, default=None, help='Last block height to export.')
+    p.add_argument('--since', type=str, default=None, help='Only blocks at or after this time (Unix seconds or ISO date).')
+    p.add_argument('--until', type=str, default=None, help='Only blocks at or before this time (Unix seconds or ISO date).')
+    p.add_argument('--type', type=str, action='append', dest='types', default=None,
+                   help='Only transactions of this type (e.g. notarization, currency, reward); repeatable.')
+
+def add_tx_args(p):
+    p.add_argument('txid', type=str, help='The transaction id to look up.')
+
+def add_history_args(p):
+    p.add_argument('--address', type=str, required=True, help='The address whose transactions to list.')
+    p.add_argument('--limit', type=int, default=20, help='Show at most this many transactions (default: 20).')
+
+def add_usage_args(p):
+    p.add_argument('--since', type=str, default=None, help='Start of the window (Unix seconds or ISO date).')
+    p.add_argument('--until', type=str, default=None, help='End of the window (Unix seconds or ISO date).')
+    p.add_argument('--by', type=str, choices=['user'], default=None, help='Break the totals down per paying user.')
+    p.add_argument('--recipient', type=str, default=BILLING_ADDRESS,
+                   help=f"Address whose incoming payments are counted (default: {BILLING_ADDRESS}).")
+    p.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+def add_balance_args(p):
+    p.add_argument('--address', type=str, required=True, help='The address to check the balance for.')
+
+def add_transfer_args(p):
+    p.add_argument('--from', type=str, required=True, dest='sender', help='The address sending the coins.')
+    p.add_argument('--to', type=str, required=True, dest='recipient', help='The address receiving the coins.')
+    p.add_argument('--amount', type=int, required=True, help='The amount of coins to transfer.')
+
+# (name, help, function adding its arguments), in the order shown by --help
+COMMANDS = [
+    # --- Mode Commands ---
+    ('simulate', 'Run the non-persistent MultiCoin currency simulation.', None),
+    ('self-verify', 'Verify the integrity of the blockchain.py script itself.', None),
+    # --- CLI Tool Commands ---
+    ('notarize', '(CLI Tool) Add a file to the mempool for notarization.', add_notarize_args),
+    ('mine', '(CLI Tool) Mine a new block with all pending transactions.', add_mine_args),
+    ('verify', '(CLI Tool) Verify a file by checking its hash against the blockchain.', add_verify_args),
+    ('stats', '(CLI Tool) Print blockchain statistics in JSON format.', None),
+    ('snapshot', '(CLI Tool) Write a hash-committed state snapshot (balances + notarizations).', add_snapshot_args),
+    ('prune', '(CLI Tool) Move blocks older than a snapshot into a cold archive file.', add_prune_args),
+    ('bootstrap', '(CLI Tool) Create a new chain file from a snapshot, without replaying history.', add_bootstrap_args),
+    ('print', '(CLI Tool) Print the entire blockchain.', None),
+    ('export', '(CLI Tool) Stream blocks and transactions as JSONL or CSV.', add_export_args),
+    ('tx', '(CLI Tool) Look up a transaction by its txid.', add_tx_args),
+    ('history', '(CLI Tool) List the most recent transactions of an address.', add_history_args),
+    ('usage', '(CLI Tool) Report credits paid for HPC usage in a time window.', add_usage_args),
+    ('balance', '(CLI Tool) Calculate and show the balance of an address.', add_balance_args),
+    ('transfer', '(CLI Tool) Transfer coins from one address to another.', add_transfer_args),
+]
+
+# Exit status of `transfer` when the sender cannot cover the amount.
+EXIT_INSUFFICIENT_FUNDS = 4
+
+# Commands that save the chain file after loading it (and so hold its ChainLock).
+# `mine` takes the lock itself, only around loading and saving (see run_mine).
+CHAIN_WRITERS = ('notarize', 'stats', 'prune', 'transfer')
+
+# Global options that take a value (needed to find the command word in argv)
+GLOBAL_VALUE_OPTIONS = ('--chain', '--coin-name', '--compress', '--compress-level')
+
+def find_command(argv):
+    """Returns the subcommand word in argv (skipping global options), or None."""
+    i = 0
+    while i < len(argv):
+        if argv[i] in GLOBAL_VALUE_OPTIONS:
+            i += 2
+        elif argv[i].startswith('-'):
+            i += 1
+        else:
+            return argv[i]
+    return None
+
+def build_parser(command=None):
+    """
+    Builds the argument parser. For a known command only that subcommand is
+    registered; the full tree (and the long epilog) is only built for --help,
+    a missing command, or an unknown one (so argparse can list the choices).
+    """
+    import argparse
+    known = {name for name, _, _ in COMMANDS}
+    full = command not in known
+
+    parser = argparse.ArgumentParser(
+        description=CLI_DESCRIPTION,
+        formatter_class=argparse.RawTextHelpFormatter,
+        epilog=CLI_EPILOG if full else None,
     )
-    
+
     # Global arguments that apply to the CLI Tool Mode
     parser.add_argument('--chain', type=str, default='geminicoin.dat',
                         help='The file name for the blockchain. Allows you to maintain multiple, separate chains. Defaults to geminicoin.dat.')
     parser.add_argument('--coin-name', type=str, default='MultiCoin',
                         help='The name for the currency/reward unit. This is only applied when a new blockchain file is created.')
+    parser.add_argument('--compress', type=str, choices=CODECS, default=None,
+                        help='Compress block segments with zlib or lzma (or none). Stored with the chain and used on every later save.')
+    parser.add_argument('--compress-level', type=int, default=None,
+                        help='Compression level for --compress (0-9; default 6).')
 
     subparsers = parser.add_subparsers(dest='command', help='Choose a mode of operation or a command for the CLI tool.')
+    for name, help_text, add_args in COMMANDS:
+        if full or name == command:
+            sub = subparsers.add_parser(name, help=help_text)
+            if add_args:
+                add_args(sub)
+    return parser
 
-    # --- Mode Commands ---
-    subparsers.add_parser('simulate', help='Run the non-persistent MultiCoin currency simulation.')
-    subparsers.add_parser('self-verify', help='Verify the integrity of the blockchain.py script itself.')
-
-    # --- CLI Tool Commands ---
-    parser_notarize = subparsers.add_parser('notarize', help='(CLI Tool) Add a file to the mempool for notarization.')
-    parser_notarize.add_argument('--owner', type=str, required=True, help='The name of the file owner.')
-    parser_notarize.add_argument('--file', type=str, required=True, dest='filepath', help='The path to the file to notarize.')
-    
-    parser_mine = subparsers.add_parser('mine', help='(CLI Tool) Mine a new block with all pending transactions.')
-    parser_mine.add_argument('--miner', type=str, dest='address', default=os.environ.get('USER', 'local_miner'), 
-                             help='The address to receive the mining reward (defaults to your system username).')
-    parser_mine.add_argument('--reward', type=int, default=None, help='Override the default mining reward (use 0 to disable inflation).')
-    
-    parser_verify = subparsers.add_parser('verify', help='(CLI Tool) Verify a file by checking its hash against the blockchain.')
-    parser_verify.add_argument('filepath', type=str, help='The path to the file to verify.')
-
-    parser_stats = subparsers.add_parser('stats', help='(CLI Tool) Print blockchain statistics in JSON format.')
-    
-    parser_print = subparsers.add_parser('print', help='(CLI Tool) Print the entire blockchain.')
-    
-    parser_balance = subparsers.add_parser('balance', help='(CLI Tool) Calculate and show the balance of an address.')
-    parser_balance.add_argument('--address', type=str, required=True, help='The address to check the balance for.')
+# --- Main CLI Function ---
+def main():
+    if len(sys.argv) == 1:
+        run_original_demo()
+        return
 
-    parser_transfer = subparsers.add_parser('transfer', help='(CLI Tool) Transfer coins from one address to another.')
-    parser_transfer.add_argument('--from', type=str, required=True, dest='sender', help='The address sending the coins.')
-    parser_transfer.add_argument('--to', type=str, required=True, dest='recipient', help='The address receiving the coins.')
-    parser_transfer.add_argument('--amount', type=int, required=True, help='The amount of coins to transfer.')
+    parser = build_parser(find_command(sys.argv[1:]))
 
     # Manually handle parsing to allow global args before commands
     args = parser.parse_args()
@@ -378,48 +2350,173 @@ This tool demonstrates blockchain concepts through three distinct modes of opera
         run_self_verify()
         return
     
-    # For CLI tool commands, load the specified chain
-    gemini_coin = load_blockchain(args.chain, args.coin_name)
+    if args.command == 'bootstrap':
+        if os.path.exists(args.chain):
+            print(f"❌ '{args.chain}' already exists. Bootstrap only creates new chain files.")
+            sys.exit(1)
+        try:
+            snapshot = read_snapshot(args.snapshot)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Invalid snapshot: {e}")
+            sys.exit(1)
+        gemini_coin = Blockchain.from_snapshot(snapshot)
+        print(f"✅ Bootstrapped at height {snapshot['height']} with {len(snapshot['balances'])} accounts "
+              f"and {len(snapshot['notarizations'])} notarizations.")
+        save_blockchain(gemini_coin, args.chain)
+        return
+
+    if args.command == 'stats' and args.compress is None and os.path.exists(args.chain):
+        # Answered from the segment index alone, without loading any blocks.
+        stats = storage_stats(args.chain)
+        if stats:
+            print(json.dumps(stats))
+            return
+
+    if args.command == 'export':
+        run_export(args)
+        return
+
+    if args.command == 'verify' and not (args.filepath or args.receipt):
+        parser.error('verify needs a file, a --receipt, or both')
+
+    if args.command == 'verify' and (args.chains or args.chain_dir):
+        run_multi_chain_verify(args)
+        return
+
+    if args.command == 'usage':
+        run_usage(args)
+        return
+
+    if args.command in ('tx', 'history'):
+        if not tx_index_is_current(args.chain):
+            with ChainLock(args.chain):
+                # Missing, stale or legacy: saving (re)builds every index, including the transaction index.
+                save_blockchain(load_blockchain(args.chain, args.coin_name), args.chain, quiet=True)
+        if args.command == 'tx':
+            run_tx_lookup(args)
+        else:
+            run_history(args)
+        return
 
     if args.command == 'notarize':
-        file_hash = hash_file(args.filepath)
-        if file_hash:
-            gemini_coin.add_transaction({
-                'type': 'notarization', 'owner': args.owner, 'file_hash': file_hash,
-                'filename': os.path.basename(args.filepath), 'timestamp': time.time()
-            })
+        file_hash, hash_fields = hash_file_for(args)
+        if not file_hash:
+            return
+        notarization = {
+            'type': 'notarization', 'owner': args.owner, 'file_hash': file_hash,
+            'filename': os.path.basename(args.filepath), 'timestamp': time.time(), **hash_fields
+        }
+        # Admitting a transaction is one append to the mempool journal, not a chain rewrite.
+        if args.compress is None and append_journal(args.chain, notarization):
             print(f"✅ Notarization for '{args.filepath}' added to the mempool.")
-    elif args.command == 'mine':
-        gemini_coin.mine_pending_transactions(args.address, custom_reward=args.reward)
+            return
+
+    if args.command == 'mine':
+        run_mine(args)
+        return
+
+    if args.command in CHAIN_WRITERS:
+        # Held from the load to the save; the lock is released when the process exits.
+        ChainLock(args.chain).acquire()
+
+    # For CLI tool commands, load the specified chain
+    gemini_coin = load_cli_chain(args)
+    if args.command == 'stats':
+        # New or legacy chain file: rewrite it in the segmented format, then report from the index.
+        save_blockchain(gemini_coin, args.chain, quiet=True)
+        stats = storage_stats(args.chain)
+
+    if args.command == 'notarize':
+        # New, legacy or recompressed chain file: a full save also starts its journal.
+        gemini_coin.add_transaction(notarization)
+        print(f"✅ Notarization for '{args.filepath}' added to the mempool.")
     elif args.command == 'verify':
-        file_hash = hash_file(args.filepath)
+        if args.receipt:
+            run_receipt_verify(gemini_coin, args)
+            return
+        if args.chunks:
+            run_chunk_verify(gemini_coin, args)
+            return
+        file_hash, _ = hash_file_for(args)
         if file_hash:
-            block, tx = gemini_coin.find_hash(file_hash)
-            if block:
-                print(f"\n--- Verification Successful!---\n✅ File hash found on the blockchain in Block #{block.index}.")
+            height, tx = gemini_coin.find_hash(file_hash)
+            if height is not None:
+                print(f"\n--- Verification Successful!---\n✅ File hash found on the blockchain in Block #{height}.")
             else:
                 print(f"\n--- Verification Failed---\n❌ File hash not found in the blockchain.")
+                if args.merkle:
+                    print("   Use --chunk N to check single chunks against the notarized root.")
+        return
     elif args.command == 'stats':
-        tx_count = sum(len(b.transactions) if isinstance(b.transactions, list) else 1 for b in gemini_coin.chain)
-        print(f'{{"height": {len(gemini_coin.chain)}, "tx_count": {tx_count}, "last_hash": "{gemini_coin.chain[-1].hash}"}}')
+        # Read-only: print and return without rewriting the chain file.
+        print(json.dumps(stats))
+        return
+    elif args.command == 'snapshot':
+        height = args.height if args.height is not None else gemini_coin.get_latest_block().index
+        out = args.out or args.chain + '.snapshot'
+        try:
+            snapshot = write_snapshot(gemini_coin, height, out)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"📸 Snapshot of Block #{height} written to '{out}' ({len(snapshot['balances'])} accounts, "
+              f"{len(snapshot['notarizations'])} notarizations, state hash {snapshot['state_hash'][:16]}...)")
+        return
+    elif args.command == 'prune':
+        try:
+            snapshot = read_snapshot(args.snapshot)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Invalid snapshot: {e}")
+            sys.exit(1)
+        block = gemini_coin.get_block(snapshot['height'])
+        if block is None or block.hash != snapshot['tip']['hash']:
+            print(f"❌ Snapshot does not match Block #{snapshot['height']} on this chain.")
+            sys.exit(1)
+        if args.archive:
+            # Stored relative to the chain file, so readers find it from any working directory.
+            chain_dir = os.path.dirname(os.path.abspath(args.chain))
+            relative = os.path.relpath(os.path.abspath(args.archive), chain_dir)
+            current = cold_archive_filename(args.chain, gemini_coin.cold_archive)
+            if os.path.exists(current) and os.path.abspath(current) != os.path.abspath(args.archive):
+                print(f"❌ Earlier pruned blocks are in '{current}'; keep archiving there.")
+                sys.exit(1)
+            gemini_coin.cold_archive = relative
+        removed = gemini_coin.prune(snapshot['height'])
+        if not removed:
+            print("Nothing to prune.")
+            return
+        archive = cold_archive_filename(args.chain, gemini_coin.cold_archive)
+        archive_blocks(removed, archive, gemini_coin.storage['codec'], gemini_coin.storage['level'])
+        print(f"🧊 Archived {len(removed)} blocks (#{removed[0].index}-#{removed[-1].index}) to '{archive}'.")
     elif args.command == 'print':
         gemini_coin.print_chain()
+        return
     elif args.command == 'balance':
         balance = gemini_coin.calculate_balance(args.address)
         print(f"\n💰 The balance for address '{args.address}' is: {balance} {gemini_coin.coin_name}")
+        return
     elif args.command == 'transfer':
-        sender_balance = gemini_coin.calculate_balance(args.sender)
+        # Checked under the chain lock and net of the sender's pending transfers, so two
+        # transfers racing each other cannot both spend the same credits.
+        sender_balance = gemini_coin.spendable_balance(args.sender)
         if sender_balance >= args.amount:
-            gemini_coin.add_transaction({
+            transfer = {
                 'type': 'currency',
                 'sender': args.sender,
                 'recipient': args.recipient,
                 'amount': args.amount,
                 'timestamp': time.time()
-            })
+            }
+            journaled = args.compress is None and append_journal(args.chain, transfer)
+            if not journaled:
+                gemini_coin.add_transaction(transfer)
             print(f"✅ {args.amount} {gemini_coin.coin_name} transferred from {args.sender} to {args.recipient}. A miner needs to mine this transaction.")
+            if journaled:
+                return
         else:
-            print(f"❌ Insufficient funds. {args.sender} has {sender_balance} {gemini_coin.coin_name}, but tried to send {args.amount}.")
+            print(f"❌ Insufficient funds. {args.sender} has {sender_balance} {gemini_coin.coin_name} "
+                  f"(after pending transfers), but tried to send {args.amount}.", file=sys.stderr)
+            sys.exit(EXIT_INSUFFICIENT_FUNDS)
 
     save_blockchain(gemini_coin, args.chain)
 
@@ -8,12 +8,14 @@ BLOCKCHAIN="./blockchain.py"
 CHAIN_FILE="hpc_campus.dat"
 COIN_NAME="HPCCredit"
 LOG_FILE="sim_output.log"
+EVENTS_FILE="hpc_events.jsonl"
+EVENT_STATS="./event_stats.py"
 
 # Ensure we are in the right directory
 cd "$(dirname "$0")"
 
 # Cleanup
-rm -f "$LOG_FILE"
+rm -f "$LOG_FILE" "$EVENTS_FILE" "$EVENTS_FILE.stats"
 touch "$LOG_FILE"
 
 # Trap Ctrl+C to kill the background simulation
@@ -53,14 +55,17 @@ function draw_dashboard() {
     echo "    Latest Hash:       $HASH"
     echo "-------------------------------------------------------------------------------"
     echo " 📊 HPC ECONOMY"
-    # Estimate jobs by looking for "Job completed" in the log
-    JOBS_RUN=$(grep -c "Job completed" "$LOG_FILE")
-    # Estimate spent credits by grepping "TOTAL COST" lines and summing
-    CREDITS_SPENT=$(grep "TOTAL COST" "$LOG_FILE" | awk '{sum+=$4} END {print sum}')
-    if [ -z "$CREDITS_SPENT" ]; then CREDITS_SPENT=0; fi
+    # Pre-computed aggregates of the scheduler's event stream (only new events are read)
+    ECONOMY=$("$EVENT_STATS" --events "$EVENTS_FILE" --no-recent 2>/dev/null)
+    JOBS_RUN=$(echo "$ECONOMY" | sed -n 's/.*"jobs_completed": \([0-9]*\).*/\1/p')
+    CREDITS_SPENT=$(echo "$ECONOMY" | sed -n 's/.*"credits_spent": \([0-9]*\).*/\1/p')
+    ACTIVE_USERS=$(echo "$ECONOMY" | sed -n 's/.*"active_users": \([0-9]*\).*/\1/p')
+    JOB_P95=$(echo "$ECONOMY" | sed -n 's/.*"notarized": {[^}]*"p95": \([0-9.]*\).*/\1/p')
     
-    echo "    Jobs Completed:    $JOBS_RUN"
-    echo "    Credits Spent:     $CREDITS_SPENT $COIN_NAME"
+    echo "    Jobs Completed:    ${JOBS_RUN:-0}"
+    echo "    Credits Spent:     ${CREDITS_SPENT:-0} $COIN_NAME"
+    echo "    Active Users:      ${ACTIVE_USERS:-0}"
+    echo "    Notarize p95:      ${JOB_P95:-n/a} s"
     echo "-------------------------------------------------------------------------------"
     echo " 📝 LIVE LOG (Last 10 Lines)"
     echo "-------------------------------------------------------------------------------"
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Incremental aggregates over the scheduler's JSONL event stream (hpc_events.jsonl).
+
+scheduler.py appends one JSON object per line for each job_submitted, payment,
+job_completed, notarized and rejected event. EventAggregator reads only the
+bytes added since its last update (it remembers the file offset) and keeps:
+  - counters per event type, jobs completed, credits spent and active users,
+  - a window of recent durations per event type, for latency percentiles.
+
+The dashboards read summary() instead of scraping console output. From the shell,
+this script updates a small state file next to the event log and prints the summary:
+  $ ./event_stats.py --events hpc_events.jsonl
+"""
+import argparse
+import json
+import os
+from collections import deque
+
+EVENTS_FILE = "hpc_events.jsonl"
+EVENT_TYPES = ('job_submitted', 'payment', 'job_completed', 'notarized', 'rejected')
+LATENCY_WINDOW = 1000   # most recent durations kept per event type
+RECENT_EVENTS = 20      # events kept for the dashboards' live feed
+STATE_VERSION = 1
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class EventAggregator:
+    """Rolling aggregates over one JSONL event file, updated from the last offset read."""
+
+    def __init__(self, events_file=EVENTS_FILE):
+        self.events_file = events_file
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.counts = {event: 0 for event in EVENT_TYPES}
+        self.credits_spent = 0
+        self.users = set()
+        self.rejections = {}
+        self.durations = {event: deque(maxlen=LATENCY_WINDOW) for event in EVENT_TYPES}
+        self.recent = deque(maxlen=RECENT_EVENTS)
+        self.bad_lines = 0
+
+    def apply(self, event):
+        kind = event.get('event')
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if kind == 'job_submitted' and event.get('user'):
+            self.users.add(event['user'])
+        elif kind == 'payment':
+            self.credits_spent += event.get('amount', 0)
+        elif kind == 'rejected':
+            reason = event.get('reason', 'unknown')
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+        if isinstance(event.get('duration'), (int, float)):
+            self.durations.setdefault(kind, deque(maxlen=LATENCY_WINDOW)).append(event['duration'])
+        self.recent.append(event)
+
+    def update(self):
+        """Applies events appended since the last update. Returns how many were read."""
+        try:
+            size = os.path.getsize(self.events_file)
+        except OSError:
+            return 0
+        if size < self.offset:
+            self.reset()  # The log was truncated or replaced: start over.
+        if size == self.offset:
+            return 0
+        read = 0
+        with open(self.events_file, 'rb') as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # A line still being written; pick it up next time.
+                self.offset += len(line)
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    self.bad_lines += 1
+                    continue
+                if isinstance(event, dict):
+                    self.apply(event)
+                    read += 1
+        return read
+
+    def summary(self):
+        latency = {}
+        for kind, values in self.durations.items():
+            if values:
+                latency[kind] = {
+                    'samples': len(values),
+                    'p50': round(percentile(values, 50), 3),
+                    'p95': round(percentile(values, 95), 3),
+                    'p99': round(percentile(values, 99), 3),
+                    'max': round(max(values), 3),
+                }
+        return {
+            'events': dict(self.counts),
+            'jobs_completed': self.counts.get('job_completed', 0),
+            'credits_spent': self.credits_spent,
+            'active_users': len(self.users),
+            'user_list': sorted(self.users),
+            'rejections': dict(self.rejections),
+            'latency_seconds': latency,
+            'recent': list(self.recent),
+            'bad_lines': self.bad_lines,
+        }
+
+    # --- Persistence (lets short-lived callers such as dashboard.sh stay incremental) ---
+
+    def state(self):
+        return {
+            'version': STATE_VERSION, 'events_file': os.path.abspath(self.events_file), 'offset': self.offset,
+            'counts': self.counts, 'credits_spent': self.credits_spent, 'users': sorted(self.users),
+            'rejections': self.rejections, 'durations': {k: list(v) for k, v in self.durations.items()},
+            'recent': list(self.recent), 'bad_lines': self.bad_lines,
+        }
+
+    def restore(self, state):
+        if state.get('version') != STATE_VERSION or state.get('events_file') != os.path.abspath(self.events_file):
+            return
+        self.offset = state['offset']
+        self.counts = state['counts']
+        self.credits_spent = state['credits_spent']
+        self.users = set(state['users'])
+        self.rejections = state['rejections']
+        self.durations = {k: deque(v, maxlen=LATENCY_WINDOW) for k, v in state['durations'].items()}
+        self.recent = deque(state['recent'], maxlen=RECENT_EVENTS)
+        self.bad_lines = state['bad_lines']
+
+
+def state_filename(events_file):
+    return events_file + '.stats'
+
+
+def load_aggregator(events_file):
+    """An aggregator resumed from the saved state next to the event file (if any)."""
+    aggregator = EventAggregator(events_file)
+    try:
+        with open(state_filename(events_file), 'r') as f:
+            aggregator.restore(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        aggregator.reset()
+    return aggregator
+
+
+def save_aggregator(aggregator):
+    filename = state_filename(aggregator.events_file)
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(aggregator.state(), f)
+    os.replace(tmp, filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate the HPC scheduler's JSONL event stream")
+    parser.add_argument('--events', default=EVENTS_FILE, help='Event file written by scheduler.py.')
+    parser.add_argument('--no-recent', action='store_true', help='Leave the recent events out of the output.')
+    args = parser.parse_args()
+
+    aggregator = load_aggregator(args.events)
+    offset = aggregator.offset
+    aggregator.update()
+    if aggregator.offset != offset:
+        save_aggregator(aggregator)
+    summary = aggregator.summary()
+    if args.no_recent:
+        summary.pop('recent')
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the HPC billing workflow (scheduler.py + blockchain.py).
+
+Replays a workload against a fresh chain in a scratch directory. Every job is a real
+`scheduler.py` run (balance check, payment, job, notarization, mining) and every top-up
+a real `blockchain.py transfer`. Arrivals follow the workload's timestamps (or a Poisson
+arrival rate) and at most `concurrency` submissions run at once. Latency is measured
+from each submission's scheduled arrival, so time spent waiting for a free slot counts.
+
+Afterwards the harness mines whatever is still pending and audits the chain: every
+payment, top-up and notarization that was acknowledged must be on it. Results are
+printed as JSON. The workload file is one JSON object:
+  {"concurrency": 4, "arrival_rate": 2.0,
+   "users": {"Alice": 5000, "Bob": 200},
+   "jobs": [{"user": "Alice", "cpu_cores": 4, "gpus": 0, "mem": 8, "hours": 1.0, "at": 0.0}, ...],
+   "topups": [{"user": "Bob", "amount": 1000, "at": 5.0}]}
+`at` is seconds after the start; jobs without it arrive at `arrival_rate` per second.
+
+  $ ./load_harness.py --workload campus_day.json
+  $ ./load_harness.py --synthetic 200 --rate 4 --concurrency 8
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from blockchain import hash_file, load_blockchain, storage_stats
+from event_stats import percentile
+from scheduler import ADMIN_ADDRESS, CHAIN_FILE, COIN_NAME, synthetic_workload
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GENESIS_CREDITS = 100000000
+DEFAULT_CREDITS = 5000      # starting balance of users the workload does not fund
+SUBMIT_TIMEOUT = 600        # seconds before a submission counts as an error
+DRAIN_ATTEMPTS = 10         # `mine` runs to confirm what is still pending at the end
+SAMPLES = 10                # lost transactions and errors listed in the report
+
+
+def read_workload(filename):
+    with open(filename, 'r') as f:
+        workload = json.load(f)
+    if not isinstance(workload, dict) or not isinstance(workload.get('jobs', []), list):
+        raise ValueError(f"{filename}: expected a JSON object with a 'jobs' list")
+    return workload
+
+
+def synthetic_load(count, credits, seed=None):
+    """A workload with scheduler.py's synthetic job mix, arriving at the harness's rate."""
+    jobs = [{key: job[key] for key in ('user', 'cpu_cores', 'gpus', 'mem', 'hours')}
+            for job in synthetic_workload(count, seed=seed)]
+    return {'users': {user: credits for user in sorted({job['user'] for job in jobs})}, 'jobs': jobs}
+
+
+def schedule_arrivals(workload, rate, seed=None):
+    """(arrival second, kind, item) for every job and top-up, in arrival order."""
+    rng = random.Random(seed)
+    arrivals, clock = [], 0.0
+    for job in workload.get('jobs', []):
+        if 'at' in job:
+            at = float(job['at'])
+        else:
+            clock += rng.expovariate(rate) if rate else 0.0
+            at = clock
+        arrivals.append((at, 'job', job))
+    arrivals += [(float(topup.get('at', 0.0)), 'topup', topup) for topup in workload.get('topups', [])]
+    return sorted(arrivals, key=lambda arrival: arrival[0])
+
+
+def run_tool(workdir, args):
+    return subprocess.run([os.path.join(workdir, 'blockchain.py'), '--chain', CHAIN_FILE, '--coin-name', COIN_NAME]
+                          + args, cwd=workdir, capture_output=True, text=True, timeout=SUBMIT_TIMEOUT)
+
+
+def prepare_workdir(workdir, users):
+    """Links the tools into the scratch directory and funds every user on a new chain."""
+    for script in ('blockchain.py', 'scheduler.py'):
+        os.symlink(os.path.join(HERE, script), os.path.join(workdir, script))
+    run_tool(workdir, ['mine', '--miner', ADMIN_ADDRESS, '--reward', str(GENESIS_CREDITS)])
+    for user, credits in sorted(users.items()):
+        run_tool(workdir, ['transfer', '--from', ADMIN_ADDRESS, '--to', user, '--amount', str(credits)])
+    run_tool(workdir, ['mine', '--miner', ADMIN_ADDRESS, '--reward', '0'])
+
+
+def submit(workdir, env, kind, item, index):
+    """Runs one submission to completion. Returns (finished time, error message or None)."""
+    if kind == 'job':
+        cmd = [sys.executable, os.path.join(workdir, 'scheduler.py'), '--user', item['user'],
+               '--cpu-cores', str(item.get('cpu_cores', 1)), '--gpus', str(item.get('gpus', 0)),
+               '--mem', str(item.get('mem', 4)), '--time', str(item.get('hours', 1.0)), f"load_{index}.sh"]
+    else:
+        cmd = [os.path.join(workdir, 'blockchain.py'), '--chain', CHAIN_FILE, '--coin-name', COIN_NAME,
+               'transfer', '--from', ADMIN_ADDRESS, '--to', item['user'], '--amount', str(item['amount'])]
+    try:
+        result = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True, timeout=SUBMIT_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return time.time(), f"{kind} {index}: {e}"
+    if result.returncode != 0:
+        return time.time(), f"{kind} {index}: exit {result.returncode}: {result.stderr.strip()[-200:]}"
+    return time.time(), None
+
+
+def replay(workdir, env, arrivals, concurrency):
+    """Submits each arrival on time (open loop). Returns [(arrival, kind, item, index, started_at, finished, error)]."""
+    results, lock = [], threading.Lock()
+    started_at = time.time()
+
+    def run(arrival, kind, item, index):
+        finished, error = submit(workdir, env, kind, item, index)
+        with lock:
+            results.append((arrival, kind, item, index, started_at, finished, error))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, (at, kind, item) in enumerate(arrivals):
+            delay = started_at + at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, at, kind, item, index)
+    return results
+
+
+def chain_stats(workdir):
+    stats = storage_stats(os.path.join(workdir, CHAIN_FILE)) or {}
+    return {key: stats.get(key) for key in ('height', 'tx_count', 'file_bytes')}
+
+
+def read_events(filename):
+    events = []
+    with contextlib.suppress(OSError), open(filename, 'r') as f:
+        for line in f:
+            with contextlib.suppress(ValueError):
+                events.append(json.loads(line))
+    return events
+
+
+def load_chain(workdir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return load_blockchain(os.path.join(workdir, CHAIN_FILE), COIN_NAME)
+
+
+def drain(workdir):
+    """Mines until nothing is pending. Returns the number of transactions still pending."""
+    for _ in range(DRAIN_ATTEMPTS):
+        if not load_chain(workdir).pending_transactions:
+            return 0
+        run_tool(workdir, ['mine', '--miner', ADMIN_ADDRESS, '--reward', '0'])
+    return len(load_chain(workdir).pending_transactions)
+
+
+def topup_transaction(item):
+    return ('transfer', ADMIN_ADDRESS, item['user'], item['amount'])
+
+
+def job_transactions(workdir, events):
+    """job_id -> the transactions the scheduler acknowledged for it (its payment and notarization)."""
+    transactions = {}
+    for event in events:
+        if event.get('event') == 'payment':
+            transactions.setdefault(event['job_id'], []).append(
+                ('transfer', event['user'], ADMIN_ADDRESS, event['amount']))
+        elif event.get('event') == 'notarized':
+            transactions.setdefault(event['job_id'], []).append(
+                ('notarization', hash_file(os.path.join(workdir, event['file']))))
+    return transactions
+
+
+def audit(workdir, jobs, results, users):
+    """
+    Acknowledged transactions that are neither on the chain nor pending, and users the
+    chain leaves with a negative balance (a double spend that got through).
+    Returns (report, Counter of the missing transactions).
+    """
+    expected = Counter(tx for transactions in jobs.values() for tx in transactions)
+    for _, kind, item, _, _, _, error in results:
+        if kind == 'topup' and error is None:
+            expected[topup_transaction(item)] += 1
+
+    blockchain = load_chain(workdir)
+    found = Counter()
+    mined = [tx for block in blockchain.chain if isinstance(block.transactions, list) for tx in block.transactions]
+    for tx in mined + blockchain.pending_transactions:
+        if tx.get('type') == 'notarization':
+            found[('notarization', tx.get('file_hash'))] += 1
+        elif tx.get('type') != 'reward':
+            found[('transfer', tx.get('sender'), tx.get('recipient'), tx.get('amount'))] += 1
+    lost = expected - found
+    balances = {user: blockchain.calculate_balance(user) for user in users}
+    return {
+        'expected': sum(expected.values()),
+        'lost': sum(lost.values()),
+        'lost_by_kind': dict(Counter(key[0] for key in lost.elements())),
+        'lost_samples': [list(key) for key in list(lost.elements())[:SAMPLES]],
+        'overdrawn_users': {user: balance for user, balance in sorted(balances.items()) if balance < 0},
+    }, lost
+
+
+def claim_lost(lost, transactions):
+    """
+    True if any of these transactions is missing, taking it off the `lost` tally. Equal
+    payments (same user and amount) cannot be told apart on the chain, so a missing one
+    is blamed on whichever of those jobs asks first; the totals are exact either way.
+    """
+    missing = [tx for tx in transactions if lost[tx] > 0]
+    for tx in missing:
+        lost[tx] -= 1
+    return bool(missing)
+
+
+def latency_summary(values):
+    if not values:
+        return None
+    return {
+        'samples': len(values),
+        'mean': round(sum(values) / len(values), 3),
+        'p50': round(percentile(values, 50), 3),
+        'p95': round(percentile(values, 95), 3),
+        'p99': round(percentile(values, 99), 3),
+        'max': round(max(values), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test of scheduler.py and blockchain.py")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--workload', help='JSON workload file to replay (see the module docstring).')
+    source.add_argument('--synthetic', type=int, metavar='N', help="Replay N jobs from scheduler.py's synthetic mix.")
+    parser.add_argument('--concurrency', type=int, default=None, help='Submissions in flight at once (default: workload, else 4).')
+    parser.add_argument('--rate', type=float, default=None, help='Job arrivals per second (default: workload, else 1).')
+    parser.add_argument('--credits', type=int, default=DEFAULT_CREDITS, help='Starting balance of each synthetic user.')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for synthetic jobs and arrival times.')
+    parser.add_argument('--job-seconds', type=float, default=0.0, help='How long each simulated job runs.')
+    parser.add_argument('--out', default=None, help='Also write the JSON results to this file.')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directory for inspection.')
+    args = parser.parse_args()
+
+    workload = read_workload(args.workload) if args.workload else synthetic_load(args.synthetic, args.credits, args.seed)
+    concurrency = args.concurrency or workload.get('concurrency', 4)
+    rate = args.rate if args.rate is not None else workload.get('arrival_rate', 1.0)
+    arrivals = schedule_arrivals(workload, rate, args.seed)
+    users = {item['user']: DEFAULT_CREDITS for _, _, item in arrivals}
+    users.update(workload.get('users', {}))
+
+    workdir = tempfile.mkdtemp(prefix='multicoin_load_')
+    events_file = os.path.join(workdir, 'events.jsonl')
+    env = dict(os.environ, HPC_EVENTS_FILE=events_file, HPC_JOB_SECONDS=str(args.job_seconds))
+    results = {'workload': args.workload or f"synthetic:{args.synthetic}", 'jobs': len(workload.get('jobs', [])),
+               'topups': len(workload.get('topups', [])), 'users': len(users), 'concurrency': concurrency,
+               'arrival_rate': rate, 'workdir': workdir}
+    try:
+        prepare_workdir(workdir, users)
+        before = chain_stats(workdir)
+        started = time.time()
+        replayed = replay(workdir, env, arrivals, concurrency)
+        duration = time.time() - started
+        after = chain_stats(workdir)
+
+        pending = drain(workdir)
+        events = read_events(events_file)
+        jobs = job_transactions(workdir, events)
+        report, lost = audit(workdir, jobs, replayed, users)
+
+        outcome = {}  # job_id -> 'confirmed' / 'unconfirmed' / 'rejected:<reason>'
+        for event in events:
+            if event.get('event') == 'rejected':
+                outcome[event['job_id']] = f"rejected:{event.get('reason', 'unknown')}"
+            elif event.get('event') == 'notarized':
+                outcome[event['job_id']] = 'confirmed' if event.get('confirmed') else 'unconfirmed'
+        script_jobs = {event.get('script'): event['job_id'] for event in events if event.get('event') == 'job_submitted'}
+
+        latencies = {'confirmed': [], 'topup': []}
+        counts, errors = Counter(), []
+        for arrival, kind, item, index, started_at, finished, error in replayed:
+            if error:
+                errors.append(error)
+                continue
+            if kind == 'topup':
+                state = 'topup_lost' if claim_lost(lost, [topup_transaction(item)]) else 'topup'
+            else:
+                job_id = script_jobs.get(f"load_{index}.sh")
+                # `mine` succeeding is not enough: the job's payment and notarization must be on the chain.
+                state = 'lost' if claim_lost(lost, jobs.get(job_id, [])) else outcome.get(job_id, 'incomplete')
+            counts[state] += 1
+            if state in latencies:
+                latencies[state].append(finished - (started_at + arrival))
+
+        tx_added = (after['tx_count'] or 0) - (before['tx_count'] or 0)
+        results.update({
+            'duration_seconds': round(duration, 3),
+            'outcomes': dict(counts),
+            'errors': len(errors),
+            'error_samples': errors[:SAMPLES],
+            'latency_seconds': {
+                'job_end_to_end': latency_summary(latencies['confirmed']),
+                'topup': latency_summary(latencies['topup']),
+            },
+            'throughput': {
+                'submissions_per_sec': round(len(replayed) / duration, 3) if duration else None,
+                'confirmed_tx_per_sec': round(tx_added / duration, 3) if duration else None,
+            },
+            'chain': {
+                'before': before, 'after': after,
+                'blocks_added': (after['height'] or 0) - (before['height'] or 0),
+                'tx_added': tx_added,
+                'bytes_added': (after['file_bytes'] or 0) - (before['file_bytes'] or 0),
+                'bytes_per_tx': round(((after['file_bytes'] or 0) - (before['file_bytes'] or 0)) / tx_added, 1)
+                                if tx_added else None,
+            },
+            'transactions': dict(report, pending_after_drain=pending),
+        })
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+            results.pop('workdir')
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
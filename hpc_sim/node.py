@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+MultiCoin Peer Node: runs one blockchain file as a node on a small local network.
+
+Nodes talk newline-delimited JSON over TCP (one request per connection):
+  - A node that mines a block ANNOUNCES it to every peer, and peers relay it onwards.
+  - A node that falls behind (or sees a competing branch) SYNCS from a peer:
+      1. Headers first: find the fork point, then download and check the header chain.
+      2. Bodies second: fetch block bodies in parallel ranges, spread over all peers.
+      3. Fork choice: the longest valid chain wins; orphaned transactions go back to the mempool.
+
+Example (three nodes on one machine):
+  $ ./node.py --chain n1.dat --port 9001 --peers 127.0.0.1:9002,127.0.0.1:9003
+  $ ./node.py --chain n2.dat --port 9002 --peers 127.0.0.1:9001,127.0.0.1:9003
+  $ ./node.py --chain n3.dat --port 9003 --peers-file peers.txt
+"""
+import argparse
+import json
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from blockchain import Block, append_journal, load_blockchain, save_blockchain
+
+# Protocol tuning
+HEADER_BATCH = 2000     # headers per 'headers' request
+BODY_BATCH = 250        # blocks per 'blocks' request
+FETCH_WORKERS = 8       # parallel body downloads
+RPC_TIMEOUT = 30.0      # seconds
+
+
+def parse_peer(peer):
+    """Turns 'host:port' into a (host, port) tuple."""
+    host, _, port = peer.strip().rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+
+def load_peers(peers_arg, peers_file):
+    """Builds the peer list from --peers (comma separated) and/or --peers-file (one per line)."""
+    peers = []
+    if peers_arg:
+        peers += [p for p in peers_arg.split(',') if p.strip()]
+    if peers_file:
+        with open(peers_file, 'r') as f:
+            peers += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [parse_peer(p) for p in peers]
+
+
+def rpc(peer, method, timeout=RPC_TIMEOUT, **params):
+    """Sends one request to a peer and returns the decoded 'result' field."""
+    request = dict(params, method=method)
+    with socket.create_connection(peer, timeout=timeout) as sock:
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        with sock.makefile('rb') as f:
+            reply = json.loads(f.readline())
+    if 'error' in reply:
+        raise RuntimeError(f"{peer[0]}:{peer[1]} {method}: {reply['error']}")
+    return reply['result']
+
+
+class Node:
+    """Holds one chain plus its peer list, and implements announce / sync / fork choice."""
+
+    def __init__(self, chain_file, coin_name, address, peers, difficulty=None):
+        self.chain_file = chain_file
+        self.address = address
+        self.peers = [p for p in peers if p != address]
+        self.lock = threading.RLock()
+        self.blockchain = load_blockchain(chain_file, coin_name)
+        if difficulty is not None and len(self.blockchain.chain) == 1:
+            # Difficulty is a property of the network, so it can only be set on a fresh chain.
+            self.blockchain.difficulty = difficulty
+        self.syncing = threading.Lock()
+
+    def log(self, message):
+        print(f"[node {self.address[1]}] {message}", flush=True)
+
+    def save(self):
+        save_blockchain(self.blockchain, self.chain_file, quiet=True)
+
+    # --- Request handlers ---
+
+    def handle(self, request):
+        method = request.get('method')
+        handler = getattr(self, 'rpc_' + str(method), None)
+        if handler is None:
+            raise ValueError(f"unknown method '{method}'")
+        params = {k: v for k, v in request.items() if k != 'method'}
+        return handler(**params)
+
+    def rpc_tip(self):
+        with self.lock:
+            tip = self.blockchain.get_latest_block()
+            return {'height': tip.index, 'hash': tip.hash, 'difficulty': self.blockchain.difficulty}
+
+    def rpc_headers(self, start, count):
+        with self.lock:
+            return [b.header() for b in self.blockchain.get_blocks(start, min(count, HEADER_BATCH))]
+
+    def rpc_blocks(self, start, count):
+        with self.lock:
+            return [b.to_dict() for b in self.blockchain.get_blocks(start, min(count, BODY_BATCH))]
+
+    def rpc_submit_tx(self, tx):
+        with self.lock:
+            # One journal append instead of rewriting the whole chain file.
+            if append_journal(self.chain_file, tx):
+                self.blockchain.pending_transactions.append(tx)
+            else:
+                self.blockchain.add_transaction(tx)
+                self.save()
+        return True
+
+    def rpc_mine(self, miner=None, reward=None):
+        with self.lock:
+            if not self.blockchain.mine_pending_transactions(miner or f"node_{self.address[1]}", custom_reward=reward):
+                return None
+            block = self.blockchain.get_latest_block()
+            self.save()
+        self.broadcast(block.to_dict())
+        return block.header()
+
+    def rpc_announce(self, block, origin=None):
+        """A peer mined (or relayed) a block. Append it, or sync if it does not fit our tip."""
+        block = Block.from_dict(block)
+        with self.lock:
+            tip = self.blockchain.get_latest_block()
+            if block.index <= tip.index:
+                return False  # Already have it (or it lost the race).
+            if self.blockchain.add_block(block):
+                self.save()
+                accepted = True
+            else:
+                accepted = False
+        if accepted:
+            self.broadcast(block.to_dict(), exclude=origin)
+            return True
+        # A gap or a competing branch: catch up from the announcing peer in the background.
+        if origin:
+            threading.Thread(target=self.sync_from, args=(parse_peer(origin),), daemon=True).start()
+        return False
+
+    def rpc_sync(self):
+        """Pulls from every peer; returns the resulting height."""
+        self.sync_all()
+        return self.rpc_tip()
+
+    # --- Gossip ---
+
+    def broadcast(self, block_dict, exclude=None):
+        origin = f"{self.address[0]}:{self.address[1]}"
+        def send(peer):
+            if exclude and peer == parse_peer(exclude):
+                return
+            try:
+                rpc(peer, 'announce', timeout=5.0, block=block_dict, origin=origin)
+            except (OSError, RuntimeError, ValueError):
+                pass  # Peer is down; it will sync when it comes back.
+        for peer in self.peers:
+            threading.Thread(target=send, args=(peer,), daemon=True).start()
+
+    # --- Sync (headers first, then bodies in parallel) ---
+
+    def sync_all(self):
+        for peer in self.peers:
+            try:
+                self.sync_from(peer)
+            except (OSError, RuntimeError, ValueError) as e:
+                self.log(f"sync from {peer[0]}:{peer[1]} failed: {e}")
+
+    def find_fork_point(self, peer, peer_height):
+        """
+        Walks back from our tip in exponentially growing steps until we find a block
+        the peer also has. Returns its index, or -1 if even the genesis blocks differ.
+        """
+        with self.lock:
+            local = {b.index: b.hash for b in self.blockchain.chain}
+            lowest = self.blockchain.chain[0].index  # Non-zero if old blocks were pruned.
+        height = min(max(local), peer_height)
+        step = 1
+        while height >= lowest:
+            header = rpc(peer, 'headers', start=height, count=1)
+            if header and header[0]['hash'] == local[height]:
+                return height
+            if height == lowest:
+                break
+            height = max(lowest, height - step)
+            step *= 2
+        return -1
+
+    def sync_from(self, peer):
+        if not self.syncing.acquire(blocking=False):
+            return False  # Another sync is already in progress.
+        try:
+            tip = rpc(peer, 'tip')
+            with self.lock:
+                local_height = self.blockchain.get_latest_block().index
+                difficulty = self.blockchain.difficulty
+            if tip['height'] <= local_height:
+                return False
+
+            fork = self.find_fork_point(peer, tip['height'])
+            started = time.time()
+
+            # 1. Headers: cheap to download and enough to check linkage and Proof-of-Work.
+            headers = []
+            start = fork + 1
+            while start <= tip['height']:
+                batch = rpc(peer, 'headers', start=start, count=HEADER_BATCH)
+                if not batch:
+                    break
+                headers += batch
+                start += len(batch)
+            prefix = '0' * difficulty
+            with self.lock:
+                previous_hash = self.blockchain.get_block(fork).hash if fork >= 0 else None
+            for i, header in enumerate(headers):
+                if previous_hash is not None and header['previous_hash'] != previous_hash:
+                    raise ValueError(f"header {header['index']} does not link to its parent")
+                if (fork >= 0 or i > 0) and not header['hash'].startswith(prefix):
+                    raise ValueError(f"header {header['index']} fails Proof-of-Work")
+                previous_hash = header['hash']
+
+            # 2. Bodies: fetch ranges in parallel, spreading the load over every peer that has them.
+            sources = [peer] + [p for p in self.peers if p != peer]
+            ranges = [(headers[i]['index'], min(BODY_BATCH, len(headers) - i)) for i in range(0, len(headers), BODY_BATCH)]
+            def fetch(job):
+                n, (range_start, count) = job
+                for attempt in range(len(sources)):
+                    source = sources[(n + attempt) % len(sources)]
+                    try:
+                        bodies = rpc(source, 'blocks', start=range_start, count=count)
+                    except (OSError, RuntimeError, ValueError):
+                        continue
+                    expected = headers[range_start - (fork + 1):range_start - (fork + 1) + count]
+                    if [b['hash'] for b in bodies] == [h['hash'] for h in expected]:
+                        return [Block.from_dict(b) for b in bodies]
+                raise RuntimeError(f"no peer served blocks {range_start}..{range_start + count - 1}")
+            with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+                new_blocks = [b for part in pool.map(fetch, enumerate(ranges)) for b in part]
+
+            # 3. Fork choice: adopt the branch only if the result is longer and fully valid.
+            with self.lock:
+                if fork < 0 and len(self.blockchain.chain) == 1:
+                    # A brand new node joining the network takes on the network's difficulty.
+                    self.blockchain.difficulty = tip['difficulty']
+                if not self.blockchain.replace_chain(fork, new_blocks):
+                    self.log(f"rejected branch from {peer[0]}:{peer[1]} (fork at {fork})")
+                    return False
+                self.save()
+            elapsed = time.time() - started
+            self.log(f"synced {len(new_blocks)} blocks from {peer[0]}:{peer[1]} in {elapsed:.2f}s (fork at {fork})")
+            return True
+        finally:
+            self.syncing.release()
+
+
+class NodeRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            reply = {'result': self.server.node.handle(json.loads(line))}
+        except Exception as e:
+            reply = {'error': str(e)}
+        self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+
+class NodeServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MultiCoin peer node (block propagation and sync over TCP)")
+    parser.add_argument('--chain', required=True, help='Blockchain file this node maintains.')
+    parser.add_argument('--coin-name', default='MultiCoin', help='Currency name used if the chain file is new.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on.')
+    parser.add_argument('--port', type=int, required=True, help='Port to listen on.')
+    parser.add_argument('--peers', default='', help='Comma separated host:port list of peers.')
+    parser.add_argument('--peers-file', help='File with one host:port peer per line.')
+    parser.add_argument('--difficulty', type=int, help='Proof-of-Work difficulty for a brand new chain.')
+    parser.add_argument('--no-initial-sync', action='store_true', help='Do not pull from peers at startup.')
+    args = parser.parse_args()
+
+    address = (args.host, args.port)
+    node = Node(args.chain, args.coin_name, address, load_peers(args.peers, args.peers_file), args.difficulty)
+    node.save()
+
+    with NodeServer(address, NodeRequestHandler) as server:
+        server.node = node
+        node.log(f"listening on {args.host}:{args.port} with {len(node.peers)} peers, height {node.blockchain.get_latest_block().index}")
+        if not args.no_initial_sync:
+            threading.Thread(target=node.sync_all, daemon=True).start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Local multi-node test harness for node.py.
+
+Starts several nodes on 127.0.0.1 as separate processes and measures:
+  1. Cold sync: a brand new node catching up on a large chain (blocks/sec).
+  2. Propagation: how long a freshly mined block takes to reach every other node.
+
+Results are printed as JSON. Example:
+  $ ./node_harness.py --nodes 4 --blocks 5000 --rounds 10
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from blockchain import Blockchain, save_blockchain
+from node import rpc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def build_seed_chain(filename, blocks, difficulty):
+    """Creates a chain of `blocks` mined blocks (one notarization each) for the seed node."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        bc = Blockchain(mode='tool', coin_name='HarnessCoin')
+        bc.difficulty = difficulty
+        for i in range(blocks):
+            bc.add_transaction({
+                'type': 'notarization', 'owner': f"user{i % 50}", 'file_hash': f"{i:064x}",
+                'filename': f"job_{i}.out", 'timestamp': time.time()
+            })
+            bc.mine_pending_transactions('HPC_Core', custom_reward=0)
+    save_blockchain(bc, filename, quiet=True)
+
+
+def start_node(workdir, port, ports, difficulty, log):
+    peers = ','.join(f"127.0.0.1:{p}" for p in ports if p != port)
+    cmd = [sys.executable, os.path.join(HERE, 'node.py'), '--chain', os.path.join(workdir, f"node_{port}.dat"),
+           '--port', str(port), '--peers', peers, '--difficulty', str(difficulty), '--no-initial-sync']
+    return subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until_up(port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            return rpc(('127.0.0.1', port), 'tip', timeout=1.0)
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"node on port {port} did not start")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-node propagation and sync benchmark for node.py")
+    parser.add_argument('--nodes', type=int, default=4, help='Number of nodes to start (the first one is the seed).')
+    parser.add_argument('--base-port', type=int, default=19000, help='First port; node i listens on base+i.')
+    parser.add_argument('--blocks', type=int, default=2000, help='Length of the seed chain the cold node must sync.')
+    parser.add_argument('--rounds', type=int, default=10, help='Blocks to mine when measuring propagation.')
+    parser.add_argument('--difficulty', type=int, default=2, help='Proof-of-Work difficulty (kept low for speed).')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directory for inspection.')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='multicoin_nodes_')
+    ports = [args.base_port + i for i in range(args.nodes)]
+    results = {'nodes': args.nodes, 'seed_blocks': args.blocks, 'difficulty': args.difficulty, 'workdir': workdir}
+
+    build_seed_chain(os.path.join(workdir, f"node_{ports[0]}.dat"), args.blocks, args.difficulty)
+
+    log = open(os.path.join(workdir, 'nodes.log'), 'w')
+    procs = [start_node(workdir, port, ports, args.difficulty, log) for port in ports]
+    try:
+        for port in ports:
+            wait_until_up(port)
+
+        # 1. Cold sync: one fresh node pulls the whole seed chain.
+        cold = ('127.0.0.1', ports[1])
+        started = time.time()
+        tip = rpc(cold, 'sync', timeout=600)
+        elapsed = time.time() - started
+        results['cold_sync'] = {
+            'height': tip['height'],
+            'seconds': round(elapsed, 3),
+            'blocks_per_sec': round(tip['height'] / elapsed, 1) if elapsed else None,
+        }
+        for port in ports[2:]:
+            rpc(('127.0.0.1', port), 'sync', timeout=600)
+
+        # 2. Propagation: mine on the seed and time until every other node has the block.
+        seed = ('127.0.0.1', ports[0])
+        latencies = []
+        for i in range(args.rounds):
+            rpc(seed, 'submit_tx', tx={'type': 'notarization', 'owner': 'harness', 'file_hash': f"{i:064x}",
+                                       'filename': f"round_{i}.out", 'timestamp': time.time()})
+            header = rpc(seed, 'mine', miner='HPC_Core', reward=0)
+            mined_at = time.time()
+            waiting = set(ports[1:])
+            deadline = time.time() + 30
+            while waiting and time.time() < deadline:
+                for port in list(waiting):
+                    if rpc(('127.0.0.1', port), 'tip')['hash'] == header['hash']:
+                        latencies.append(time.time() - mined_at)
+                        waiting.discard(port)
+                time.sleep(0.002)
+            results.setdefault('lost_announcements', 0)
+            results['lost_announcements'] += len(waiting)
+
+        if latencies:
+            results['propagation_ms'] = {
+                'samples': len(latencies),
+                'mean': round(statistics.mean(latencies) * 1000, 2),
+                'p50': round(percentile(latencies, 50) * 1000, 2),
+                'p95': round(percentile(latencies, 95) * 1000, 2),
+                'max': round(max(latencies) * 1000, 2),
+            }
+        results['final_tips'] = {port: rpc(('127.0.0.1', port), 'tip')['height'] for port in ports}
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+        log.close()
+        if not args.keep:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+            results.pop('workdir')
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
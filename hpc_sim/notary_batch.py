@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Batch Notary: notarizes many files for the chain cost of a single transaction.
+
+Submitters queue notarization requests in a pending file next to the chain
+(<chain>.batch, one JSON request per line). `commit` takes every queued request,
+builds a Merkle tree over them and adds ONE notarization transaction to the chain,
+whose file_hash is the tree's root. Every request gets an inclusion receipt (the
+request plus its audit path to the root) in <chain>.receipts/<request id>.json.
+Once the transaction is mined, blockchain.py checks a receipt against the chain:
+
+  $ ./notary_batch.py --chain hpc_campus.dat submit --owner alice --file job_1.out --file job_2.out
+  $ ./notary_batch.py --chain hpc_campus.dat commit
+  $ ./blockchain.py --chain hpc_campus.dat mine
+  $ ./blockchain.py --chain hpc_campus.dat verify job_1.out --receipt hpc_campus.dat.receipts/<id>.json
+"""
+import argparse
+import fcntl
+import json
+import os
+import sys
+import time
+
+from blockchain import (HASH_MODE_BATCH, RECEIPT_VERSION, ChainLock, append_journal, batch_leaf,
+                        hash_file, load_blockchain, merkle_levels, merkle_proof, save_blockchain)
+
+BATCH_OWNER = "batch_notary"
+
+
+def queue_filename(chain_file):
+    return chain_file + '.batch'
+
+
+def receipts_dirname(chain_file):
+    return chain_file + '.receipts'
+
+
+def receipt_filename(chain_file, request_id):
+    return os.path.join(receipts_dirname(chain_file), request_id + '.json')
+
+
+def submit(chain_file, owner, file_hash, filename):
+    """Queues one notarization request and returns its id (also the receipt's name)."""
+    request = {
+        # Random, so identical requests get distinct leaves and a receipt reveals
+        # nothing guessable about the other requests in its batch.
+        'id': os.urandom(8).hex(), 'owner': owner, 'file_hash': file_hash,
+        'filename': filename, 'timestamp': time.time(),
+    }
+    queue = queue_filename(chain_file)
+    while True:
+        with open(queue, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                same_file = os.fstat(f.fileno()).st_ino == os.stat(queue).st_ino
+            except FileNotFoundError:
+                same_file = False
+            if same_file:
+                f.write(json.dumps(request, separators=(',', ':')) + '\n')
+                return request['id']
+        # A commit took this queue file while we waited for the lock: use the new one.
+
+
+def read_requests(filename):
+    """The complete requests in a queue file (a torn last line is skipped), without duplicates."""
+    requests = {}
+    with open(filename, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(request, dict) and 'id' in request:
+                requests.setdefault(request['id'], request)
+    return list(requests.values())
+
+
+def write_receipts(chain_file, requests, levels):
+    os.makedirs(receipts_dirname(chain_file), exist_ok=True)
+    root = levels[-1][0].hex()
+    for index, request in enumerate(requests):
+        receipt = {
+            'version': RECEIPT_VERSION, 'request': request, 'root': root, 'batch_size': len(requests),
+            'proof': merkle_proof(None, index, levels), 'chain': os.path.basename(chain_file),
+        }
+        filename = receipt_filename(chain_file, request['id'])
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(receipt, f)
+        os.replace(tmp, filename)
+
+
+def commit(chain_file, coin_name='MultiCoin', owner=BATCH_OWNER):
+    """
+    Commits every queued request as one notarization and writes their receipts.
+    Returns (root, batch size), or (None, 0) if nothing was queued.
+
+    The queue is first renamed aside (under its lock), so requests submitted meanwhile
+    go to the next batch. Receipts depend only on the renamed file, so a commit that
+    crashed is simply redone by the next one (at worst notarizing the same root twice).
+    """
+    pending = queue_filename(chain_file) + '.committing'
+    if not os.path.exists(pending):
+        try:
+            with open(queue_filename(chain_file), 'rb') as f:
+                # Holding the lock means no submitter is halfway through appending.
+                fcntl.flock(f, fcntl.LOCK_EX)
+                os.replace(queue_filename(chain_file), pending)
+        except FileNotFoundError:
+            return None, 0
+    requests = read_requests(pending)
+    if not requests:
+        os.remove(pending)
+        return None, 0
+    levels = merkle_levels([batch_leaf(request) for request in requests])
+    root = levels[-1][0].hex()
+    write_receipts(chain_file, requests, levels)
+
+    notarization = {
+        'type': 'notarization', 'owner': owner, 'file_hash': root, 'filename': f"batch-{root[:16]}",
+        'timestamp': time.time(), 'hash_mode': HASH_MODE_BATCH, 'batch_size': len(requests),
+    }
+    if not append_journal(chain_file, notarization):
+        # New or legacy chain file: a full save also starts its journal.
+        with ChainLock(chain_file):
+            blockchain = load_blockchain(chain_file, coin_name)
+            blockchain.add_transaction(notarization)
+            save_blockchain(blockchain, chain_file, quiet=True)
+    os.remove(pending)
+    return root, len(requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notarize many files with one Merkle-root transaction")
+    parser.add_argument('--chain', default='geminicoin.dat', help='The blockchain file (as for blockchain.py).')
+    parser.add_argument('--coin-name', default='MultiCoin', help='Currency name, used if the chain file is new.')
+    commands = parser.add_subparsers(dest='command')
+
+    p = commands.add_parser('submit', help='Queue files for the next batch.')
+    p.add_argument('--owner', required=True, help='The name of the file owner.')
+    p.add_argument('--file', action='append', dest='files', default=[], help='A file to notarize (repeatable).')
+    p.add_argument('--hash', default=None, help='Queue an already computed SHA-256 hash instead of a file.')
+    p.add_argument('--filename', default=None, help='The name recorded with --hash.')
+
+    p = commands.add_parser('commit', help='Notarize every queued request in one transaction.')
+    p.add_argument('--owner', default=BATCH_OWNER, help='Owner recorded on the batch transaction.')
+
+    args = parser.parse_args()
+    if args.command == 'submit':
+        if not args.files and not args.hash:
+            parser.error('submit needs --file or --hash')
+        entries = [(args.hash.lower(), args.filename or args.hash)] if args.hash else []
+        for filepath in args.files:
+            file_hash = hash_file(filepath)
+            if not file_hash:
+                sys.exit(1)
+            entries.append((file_hash, os.path.basename(filepath)))
+        for file_hash, filename in entries:
+            request_id = submit(args.chain, args.owner, file_hash, filename)
+            print(f"📥 Queued '{filename}' as request {request_id}; "
+                  f"receipt after commit: {receipt_filename(args.chain, request_id)}")
+    elif args.command == 'commit':
+        root, count = commit(args.chain, args.coin_name, args.owner)
+        if root is None:
+            print("No queued requests to commit.")
+        else:
+            print(f"✅ Batch of {count} requests committed as Merkle root {root[:16]}... "
+                  f"(receipts in {receipts_dirname(args.chain)}/). Mine a block to confirm it.")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
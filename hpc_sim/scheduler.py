@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse
+import json
 import subprocess
 import time
 import os
@@ -13,6 +14,22 @@ CHAIN_FILE = "hpc_campus.dat"
 COIN_NAME = "HPCCredit"
 ADMIN_ADDRESS = "HPC_Core"
 
+# Mining: each `mine` run gives up after MINE_TIMEOUT seconds and the next run
+# resumes from its checkpointed nonce (exit code 3 means "interrupted, resumable").
+MINE_TIMEOUT = 10
+MINE_ATTEMPTS = 6
+MINE_INTERRUPTED = 3
+
+# `transfer` exits with this when the sender cannot cover the amount, counting payments
+# still pending (another job of the same user may have been paid since our balance check).
+TRANSFER_INSUFFICIENT_FUNDS = 4
+
+# Structured event log (one JSON object per line), read by event_stats.py.
+EVENTS_FILE = os.environ.get("HPC_EVENTS_FILE", "hpc_events.jsonl")
+
+# How long the simulated job "runs" (load_harness.py shortens it to stress the chain).
+JOB_SECONDS = float(os.environ.get("HPC_JOB_SECONDS", "1.5"))
+
 # Pricing Model (Credits per unit-hour)
 PRICE_CPU_CORE = 10
 PRICE_GPU = 100
@@ -24,6 +41,33 @@ def run_blockchain_cmd(args):
     result = subprocess.run(cmd, capture_output=True, text=True)
     return result
 
+def emit_event(event, job_id, started=None, **fields):
+    """Appends one event to EVENTS_FILE; `started` (a time.time() value) adds a duration."""
+    record = {'ts': round(time.time(), 3), 'event': event, 'job_id': job_id}
+    if started is not None:
+        record['duration'] = round(time.time() - started, 3)
+    record.update(fields)
+    with open(EVENTS_FILE, 'a') as f:
+        f.write(json.dumps(record) + "\n")
+
+def mine_block():
+    """Mines pending transactions, showing the miner's progress. Returns True once a block is mined."""
+    cmd = [BLOCKCHAIN_SCRIPT, "--chain", CHAIN_FILE, "--coin-name", COIN_NAME,
+           "mine", "--miner", ADMIN_ADDRESS, "--reward", "0", "--timeout", str(MINE_TIMEOUT), "--progress"]
+    for attempt in range(MINE_ATTEMPTS):
+        try:
+            # Not captured, so the progress lines reach the user as they are printed.
+            result = subprocess.run(cmd)
+        except KeyboardInterrupt:
+            # The miner got the same Ctrl+C and checkpointed its nonce before exiting.
+            print("      ⏸️  Mining cancelled. Transactions stay pending; the next `mine` resumes.")
+            return False
+        if result.returncode != MINE_INTERRUPTED:
+            return result.returncode == 0
+        print(f"      ⏳ Still mining (attempt {attempt + 1}/{MINE_ATTEMPTS}), resuming from checkpoint...")
+    print("      ⚠️  Block not found yet. Transactions stay pending; the next `mine` resumes.")
+    return False
+
 def get_balance(user):
     """Gets the user's balance by parsing the tool output."""
     res = run_blockchain_cmd(["balance", "--address", user])
@@ -41,14 +85,11 @@ def get_balance(user):
 
 def submit_job(user, cpu_cores, gpus, mem, hours, script_name):
     print(f"\n--- 📋 HPC Job Submission System ---")
+    submitted = time.time()
+    job_id = f"job_{int(submitted)}_{random.randint(1000,9999)}"
     
-    # 1. Calculate Cost
-    hourly_rate = (cpu_cores * PRICE_CPU_CORE) + (gpus * PRICE_GPU) + (mem * PRICE_MEM)
-    total_cost = int(hourly_rate * hours)
-    
-    # Minimum charge of 1 credit
-    if total_cost < 1:
-        total_cost = 1
+    # 1. Calculate Cost (minimum charge of 1 credit)
+    total_cost, hourly_rate = job_cost(cpu_cores, gpus, mem, hours)
 
     print(f"User:      {user}")
     print(f"Job:       {script_name}")
@@ -57,6 +98,8 @@ def submit_job(user, cpu_cores, gpus, mem, hours, script_name):
     print(f"-----------------------------------")
     print(f"💵 Rate:          {hourly_rate} {COIN_NAME}/hr")
     print(f"💰 TOTAL COST:    {total_cost} {COIN_NAME}")
+    emit_event('job_submitted', job_id, user=user, script=script_name, cpu_cores=cpu_cores,
+               gpus=gpus, mem=mem, hours=hours, cost=total_cost)
 
     # 2. Check Balance
     balance = get_balance(user)
@@ -64,24 +107,33 @@ def submit_job(user, cpu_cores, gpus, mem, hours, script_name):
     
     if balance < total_cost:
         print(f"❌ REJECTED: Insufficient funds. You are short {total_cost - balance} credits.")
+        emit_event('rejected', job_id, submitted, user=user, reason='insufficient_funds',
+                   cost=total_cost, balance=balance)
         return
 
     # 3. Process Payment (User -> Admin)
     print(f"\n[1/3] 💸 Processing payment to {ADMIN_ADDRESS}...")
+    started = time.time()
     res = run_blockchain_cmd(["transfer", "--from", user, "--to", ADMIN_ADDRESS, "--amount", str(total_cost)])
+    if res.returncode == TRANSFER_INSUFFICIENT_FUNDS:
+        print(f"❌ REJECTED: {res.stderr.strip()}")
+        emit_event('rejected', job_id, submitted, user=user, reason='insufficient_funds', cost=total_cost)
+        return
     if res.returncode != 0:
         print(f"❌ Payment failed: {res.stderr}")
+        emit_event('rejected', job_id, submitted, user=user, reason='payment_failed', cost=total_cost)
         return
     else:
         print("      ✅ Payment transaction broadcast.")
+        emit_event('payment', job_id, started, user=user, amount=total_cost)
     
     # 4. Run "Job" (Simulated)
-    job_id = f"job_{int(time.time())}_{random.randint(1000,9999)}"
     log_file = f"{job_id}.out"
     print(f"[2/3] ⚙️  Allocating resources & running job (ID: {job_id})...")
     
     # Simulate work
-    time.sleep(1.5) 
+    started = time.time()
+    time.sleep(JOB_SECONDS)
     
     # Create dummy output file
     with open(log_file, "w") as f:
@@ -94,29 +146,313 @@ def submit_job(user, cpu_cores, gpus, mem, hours, script_name):
         f.write(f"Scientific Data: {random.randint(10000000, 99999999)}\n")
     
     print(f"      ✅ Job completed. Output saved to '{log_file}'.")
+    emit_event('job_completed', job_id, started, user=user, output=log_file)
 
     # 5. Notarize Result (Proof of Research)
     print(f"[3/3] 🔏 Notarizing result on blockchain...")
+    started = time.time()
     run_blockchain_cmd(["notarize", "--owner", user, "--file", log_file])
     print("      ✅ Notarization transaction broadcast.")
     
     # 6. Mine Block (Confirm Payment + Notarization)
     # In a real system, the miner is separate. Here, we trigger it to confirm immediately.
     print(f"\n[System] ⛏️  Mining block to confirm transactions...")
-    run_blockchain_cmd(["mine", "--miner", ADMIN_ADDRESS, "--reward", "0"])
+    confirmed = mine_block()
+    # duration: notarize + mine; total: submission to confirmation (the job's end-to-end latency).
+    emit_event('notarized', job_id, started, user=user, file=log_file, confirmed=confirmed,
+               total=round(time.time() - submitted, 3))
+    if not confirmed:
+        print(f"\n⏳ Job '{job_id}' ran, but its payment and notarization are still unconfirmed.")
+        return
     
     print(f"\n🎉 SUCCESS! Job '{job_id}' is paid for, executed, and immutable.")
 
+# --- Cluster Simulation (discrete-event, EASY backfill) ---
+# A what-if model of the cluster: jobs queue for finite nodes, the queue is ordered by
+# priority, and EASY backfill lets smaller jobs start early as long as they never delay
+# the reservation held by the job at the head of the queue. Time jumps from one event
+# (submission or job end) to the next, so a day of submissions simulates in seconds.
+# Nothing is written to the blockchain.
+CLUSTER_NODES = 16
+NODE_CORES = 32
+NODE_GPUS = 4
+NODE_MEM = 256              # GB
+DEFAULT_SIM_BALANCE = 10000  # credits per user when there is no chain to read balances from
+
+# Priority = PRIORITY_AGE_WEIGHT * hours waited + PRIORITY_BALANCE_WEIGHT * log10(1 + balance).
+# Every queued job ages at the same rate, so the order only depends on the submission time
+# and the balance at submission: a fixed heap key.
+PRIORITY_AGE_WEIGHT = 1.0
+PRIORITY_BALANCE_WEIGHT = 2.0
+# Queued jobs considered for backfill per scheduling pass (like Slurm's bf_max_job_test).
+BACKFILL_DEPTH = 100
+
+def job_cost(cpu_cores, gpus, mem, hours):
+    """Credits charged for a job (minimum 1), and the hourly rate it is based on."""
+    hourly_rate = (cpu_cores * PRICE_CPU_CORE) + (gpus * PRICE_GPU) + (mem * PRICE_MEM)
+    return max(1, int(hourly_rate * hours)), hourly_rate
+
+class Cluster:
+    """Free cores/GPUs/memory per node. A job asks for `nodes` nodes with the same resources on each."""
+
+    def __init__(self, nodes=CLUSTER_NODES, cores=NODE_CORES, gpus=NODE_GPUS, mem=NODE_MEM):
+        self.node_size = (cores, gpus, mem)
+        self.free = [[cores, gpus, mem] for _ in range(nodes)]
+
+    def fits_empty(self, job):
+        return job['nodes'] <= len(self.free) and all(need <= size for need, size in zip(job['per_node'], self.node_size))
+
+    def place(self, job, free=None, exclude=()):
+        """First-fit node ids for the job, or None if it does not fit right now."""
+        free = self.free if free is None else free
+        cores, gpus, mem = job['per_node']
+        chosen = []
+        for n, (free_cores, free_gpus, free_mem) in enumerate(free):
+            if free_cores >= cores and free_gpus >= gpus and free_mem >= mem and n not in exclude:
+                chosen.append(n)
+                if len(chosen) == job['nodes']:
+                    return chosen
+        return None
+
+    def allocate(self, job, nodes, free=None, sign=-1):
+        free = self.free if free is None else free
+        for n in nodes:
+            for i, need in enumerate(job['per_node']):
+                free[n][i] += sign * need
+
+    def release(self, job, nodes, free=None):
+        self.allocate(job, nodes, free, sign=1)
+
+def load_workload(filename):
+    """
+    Reads submissions from a JSONL file, one job per line:
+      {"submit": 0.5, "user": "Alice", "cpu_cores": 8, "gpus": 1, "mem": 32, "hours": 4,
+       "runtime": 3.2, "nodes": 1, "script": "train.sh"}
+    `submit` is hours after the start of the simulation; `hours` is the requested walltime;
+    `runtime` (default: `hours`) is how long the job really runs. Resources are per node.
+    """
+    jobs = []
+    with open(filename, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    jobs.append(json.loads(line))
+                except ValueError as e:
+                    raise ValueError(f"{filename}:{line_no}: {e}")
+    return jobs
+
+def synthetic_workload(count, hours=24.0, seed=None, users=("Alice", "Bob", "Carol", "Dave", "Erin", "Frank")):
+    """A mix of many small CPU jobs, some GPU jobs and a few large multi-node runs."""
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.70:
+            job = {'cpu_cores': rng.choice([1, 2, 4, 8]), 'gpus': 0, 'mem': rng.choice([4, 8, 16]), 'nodes': 1,
+                   'hours': rng.choice([0.25, 0.5, 1, 2])}
+        elif kind < 0.92:
+            job = {'cpu_cores': rng.choice([4, 8, 16]), 'gpus': rng.choice([1, 2, 4]), 'mem': rng.choice([32, 64, 128]),
+                   'nodes': 1, 'hours': rng.choice([2, 4, 8])}
+        elif kind < 0.98:
+            job = {'cpu_cores': rng.choice([16, 32]), 'gpus': 0, 'mem': rng.choice([64, 128]), 'nodes': 1,
+                   'hours': rng.choice([1, 2, 4])}
+        else:
+            job = {'cpu_cores': NODE_CORES, 'gpus': 0, 'mem': 128, 'nodes': rng.choice([2, 4, 8]),
+                   'hours': rng.choice([2, 4, 8])}
+        job.update(submit=round(rng.uniform(0, hours), 4), user=rng.choice(users), script=f"synthetic_{i}.sh",
+                   runtime=round(job['hours'] * rng.uniform(0.3, 1.0), 4))
+        jobs.append(job)
+    return sorted(jobs, key=lambda j: j['submit'])
+
+def simulate_cluster(workload, cluster, balances):
+    """
+    Runs the workload through the cluster and returns the report dict. `balances` maps
+    users to credits; a job's cost is taken when it is queued, so a user's queued jobs can
+    never add up to more than their balance. A job is rejected at submission if the user
+    cannot afford it on top of their queued jobs (or if it could never fit on the cluster).
+    """
+    import heapq
+    import math
+
+    events = []     # (time, 0 = job end / 1 = submission, seq, job)
+    for seq, spec in enumerate(workload):
+        nodes = int(spec.get('nodes', 1))
+        job = {'id': seq, 'user': spec.get('user', 'unknown'), 'script': spec.get('script', ''),
+               'submit': float(spec.get('submit', 0)), 'hours': float(spec['hours']), 'nodes': nodes,
+               'per_node': (int(spec.get('cpu_cores', 1)), int(spec.get('gpus', 0)), int(spec.get('mem', 4)))}
+        # Jobs are killed at their requested walltime.
+        job['runtime'] = min(float(spec.get('runtime', job['hours'])), job['hours'])
+        job['cost'], _ = job_cost(*(need * nodes for need in job['per_node']), job['hours'])
+        heapq.heappush(events, (job['submit'], 1, seq, job))
+
+    queue = []      # (priority key, seq, job)
+    running = {}    # seq -> (job, nodes)
+    finished = []
+    rejected = {'too_large': 0, 'insufficient_funds': 0}
+    backfilled = 0
+
+    def start(job, nodes, now):
+        cluster.allocate(job, nodes)
+        job['start'] = now
+        running[job['id']] = (job, nodes)
+        heapq.heappush(events, (now + job['runtime'], 0, job['id'], job))
+
+    def schedule(now):
+        nonlocal backfilled
+        # 1. Start jobs strictly in priority order while the head of the queue fits.
+        while queue:
+            head = queue[0][2]
+            nodes = cluster.place(head)
+            if nodes is None:
+                break
+            heapq.heappop(queue)
+            start(head, nodes, now)
+        if not queue:
+            return
+        # 2. Reservation for the head: the earliest time (by requested walltimes) it fits.
+        head = queue[0][2]
+        free = [list(avail) for avail in cluster.free]
+        shadow, reserved = None, set()
+        ending = sorted(running.values(), key=lambda r: r[0]['start'] + r[0]['hours'])
+        for i, (job, nodes) in enumerate(ending):
+            cluster.release(job, nodes, free)
+            end = job['start'] + job['hours']
+            if i + 1 < len(ending) and ending[i + 1][0]['start'] + ending[i + 1][0]['hours'] == end:
+                continue  # Release everything ending at the same moment before trying.
+            placement = cluster.place(head, free)
+            if placement is not None:
+                shadow, reserved = end, set(placement)
+                break
+        # 3. Backfill: later jobs may start now if they end before the reservation
+        #    or stay off the nodes it holds.
+        started = set()
+        for _, seq, job in heapq.nsmallest(BACKFILL_DEPTH + 1, queue)[1:]:
+            if not any(avail[0] for avail in cluster.free):
+                break  # Every core is busy: nothing else can start.
+            nodes = cluster.place(job)
+            if nodes is None:
+                continue
+            if shadow is not None and now + job['hours'] > shadow:
+                nodes = cluster.place(job, exclude=reserved)
+                if nodes is None:
+                    continue
+            start(job, nodes, now)
+            started.add(seq)
+            backfilled += 1
+        if started:
+            queue[:] = [entry for entry in queue if entry[1] not in started]
+            heapq.heapify(queue)
+
+    now = 0.0
+    while events:
+        now = events[0][0]
+        # Handle everything that happens at this instant (ends before submissions), then schedule once.
+        while events and events[0][0] == now:
+            _, kind, seq, job = heapq.heappop(events)
+            if kind == 0:
+                cluster.release(job, running.pop(seq)[1])
+                job['end'] = now
+                finished.append(job)
+            elif not cluster.fits_empty(job):
+                rejected['too_large'] += 1
+            elif balances.setdefault(job['user'], DEFAULT_SIM_BALANCE) < job['cost']:
+                rejected['insufficient_funds'] += 1
+            else:
+                priority = (PRIORITY_BALANCE_WEIGHT * math.log10(1 + max(0, balances[job['user']]))
+                            - PRIORITY_AGE_WEIGHT * job['submit'])
+                balances[job['user']] -= job['cost']  # Reserved now, so later submissions see it.
+                heapq.heappush(queue, (-priority, seq, job))
+        schedule(now)
+
+    return cluster_report(finished, rejected, backfilled, cluster)
+
+def cluster_report(finished, rejected, backfilled, cluster):
+    report = {'jobs_completed': len(finished), 'rejected': rejected, 'backfilled': backfilled}
+    if not finished:
+        return report
+    first_submit = min(job['submit'] for job in finished)
+    makespan = max(job['end'] for job in finished) - first_submit
+    waits = sorted(job['start'] - job['submit'] for job in finished)
+    totals = [len(cluster.free) * size for size in cluster.node_size]
+    used = [sum(job['per_node'][i] * job['nodes'] * job['runtime'] for job in finished) for i in range(3)]
+    report.update({
+        'makespan_hours': round(makespan, 3),
+        'utilization': {name: round(used[i] / (totals[i] * makespan), 4) if totals[i] and makespan else 0.0
+                        for i, name in enumerate(('cores', 'gpus', 'mem'))},
+        'wait_hours': {
+            'mean': round(sum(waits) / len(waits), 3),
+            'p50': round(waits[int(round(0.50 * (len(waits) - 1)))], 3),
+            'p95': round(waits[int(round(0.95 * (len(waits) - 1)))], 3),
+            'max': round(waits[-1], 3),
+        },
+        'credits_charged': sum(job['cost'] for job in finished),
+    })
+    return report
+
+def run_cluster_simulation(args):
+    if args.simulate:
+        workload = load_workload(args.simulate)
+    else:
+        workload = synthetic_workload(args.synthetic, seed=args.seed)
+    cluster = Cluster(args.nodes, args.node_cores, args.node_gpus, args.node_mem)
+    users = {job.get('user', 'unknown') for job in workload}
+    if args.sim_balance is not None:
+        balances = {user: args.sim_balance for user in users}
+    elif os.path.exists(CHAIN_FILE):
+        balances = {user: get_balance(user) for user in users}
+    else:
+        balances = {user: DEFAULT_SIM_BALANCE for user in users}
+
+    started = time.perf_counter()
+    report = simulate_cluster(workload, cluster, balances)
+    report['jobs_submitted'] = len(workload)
+    report['cluster'] = {'nodes': args.nodes, 'node_cores': args.node_cores, 'node_gpus': args.node_gpus,
+                         'node_mem': args.node_mem}
+    report['simulation_seconds'] = round(time.perf_counter() - started, 3)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n--- 🖥️  Cluster Simulation ({args.nodes} nodes x {args.node_cores}C/{args.node_gpus}G/{args.node_mem}GB) ---")
+    print(f"Jobs:        {report['jobs_completed']} completed of {len(workload)} submitted "
+          f"({report['backfilled']} backfilled, {sum(report['rejected'].values())} rejected)")
+    if report['jobs_completed']:
+        util = report['utilization']
+        wait = report['wait_hours']
+        print(f"Makespan:    {report['makespan_hours']:.2f} hours")
+        print(f"Utilization: cores {util['cores']:.1%}, GPUs {util['gpus']:.1%}, memory {util['mem']:.1%}")
+        print(f"Queue wait:  mean {wait['mean']:.2f}h, p50 {wait['p50']:.2f}h, p95 {wait['p95']:.2f}h, max {wait['max']:.2f}h")
+        print(f"💰 Charged:  {report['credits_charged']} {COIN_NAME}")
+    print(f"(simulated in {report['simulation_seconds']:.2f}s)")
+
 def main():
     parser = argparse.ArgumentParser(description="HPC Smart Scheduler Simulator")
-    parser.add_argument("--user", required=True, help="User submitting the job")
+    parser.add_argument("--user", help="User submitting the job")
     parser.add_argument("--cpu-cores", type=int, default=1, help="Number of CPU cores")
     parser.add_argument("--gpus", type=int, default=0, help="Number of GPUs")
     parser.add_argument("--mem", type=int, default=4, help="Memory in GB")
     parser.add_argument("--time", type=float, default=1.0, help="Duration in hours")
-    parser.add_argument("script", help="Script name to run")
+    parser.add_argument("script", nargs="?", help="Script name to run")
+
+    sim = parser.add_argument_group("cluster simulation (discrete-event, EASY backfill; nothing is written to the chain)")
+    sim.add_argument("--simulate", metavar="WORKLOAD", help="Simulate the submissions in a JSONL workload file")
+    sim.add_argument("--synthetic", type=int, metavar="N", help="Simulate N random submissions spread over a day")
+    sim.add_argument("--seed", type=int, default=None, help="Random seed for --synthetic")
+    sim.add_argument("--nodes", type=int, default=CLUSTER_NODES, help="Nodes in the cluster")
+    sim.add_argument("--node-cores", type=int, default=NODE_CORES, help="CPU cores per node")
+    sim.add_argument("--node-gpus", type=int, default=NODE_GPUS, help="GPUs per node")
+    sim.add_argument("--node-mem", type=int, default=NODE_MEM, help="Memory per node in GB")
+    sim.add_argument("--sim-balance", type=int, default=None,
+                     help="Credits per user (default: balances from the chain, if there is one)")
+    sim.add_argument("--json", action="store_true", help="Print the simulation report as JSON")
     
     args = parser.parse_args()
+
+    if args.simulate or args.synthetic:
+        run_cluster_simulation(args)
+        return
+    if not args.user or not args.script:
+        parser.error("--user and a script are required to submit a job")
     
     submit_job(args.user, args.cpu_cores, args.gpus, args.mem, args.time, args.script)
 
@@ -1,27 +1,381 @@
 import http.server
-import socketserver
 import json
 import subprocess
 import os
 import time
-import re
 import threading
 import signal
 import sys
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs, unquote
+
+import blockchain
+from event_stats import EventAggregator
 
 # Configuration
 PORT = 8000
 BLOCKCHAIN_SCRIPT = "./blockchain.py"
 CHAIN_FILE = "hpc_campus.dat"
+# Chains that can be served, selected by /api/chains/<name>/... or ?chain=<name>
+CHAIN_DIR = "."
 COIN_NAME = "HPCCredit"
 LOG_FILE = "sim_output.log"
+EVENTS_FILE = "hpc_events.jsonl"
 SIM_SCRIPT = "./hpc_arcade.sh"
 
+# Block explorer
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Blocks this deep are treated as immutable and cached by clients for a year.
+IMMUTABLE_CONFIRMATIONS = 6
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+# Loaded chains are kept in an LRU cache bounded by their estimated memory use
+# (uncompressed pickle size times CHAIN_MEMORY_FACTOR for Python object overhead).
+CHAIN_CACHE_BYTES = 512 * 1024 * 1024
+CHAIN_MEMORY_FACTOR = 4
+
 # Global variable to hold the simulation process
 sim_process = None
 
+class ExplorerIndex:
+    """
+    The explorer's view of one chain file, backed by the chain's on-disk transaction
+    index (<chain>.txindex, see blockchain.update_tx_index). The CLI keeps that index
+    current on every save; refresh() only catches up if the file changed some other way.
+    """
+    def __init__(self, chain_file):
+        self.chain_file = chain_file
+        self.lock = threading.Lock()
+        self.stamp = None
+        self.tip = (-1, None)
+
+    def refresh(self):
+        try:
+            st = os.stat(self.chain_file)
+        except OSError:
+            with self.lock:
+                self.stamp = None
+                self.tip = (-1, None)
+            return
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            if stamp == self.stamp:
+                return
+            if not blockchain.tx_index_is_current(self.chain_file):
+                # Under the chain lock, like the CLI's rebuild, so it cannot race a save.
+                with blockchain.ChainLock(self.chain_file):
+                    blockchain.update_tx_index(self.chain_file)
+            with open(self.chain_file, 'rb') as f:
+                footer = blockchain.read_segment_index(f)
+            self.tip = (footer['height'] - 1, footer['last_hash'])
+            self.stamp = stamp
+
+    def query(self, sql, params=()):
+        # One connection per call: handler threads must not share SQLite connections.
+        conn = blockchain.open_tx_index(self.chain_file)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def tip_height(self):
+        return self.tip[0]
+
+    def block_hash(self, height):
+        rows = self.query('SELECT hash FROM blocks WHERE height = ?', (height,))
+        return rows[0][0] if rows else None
+
+    def tx_location(self, txid):
+        rows = self.query('SELECT height, position FROM txs WHERE txid = ?', (txid,))
+        return rows[0] if rows else None
+
+    def address_tx_count(self, address):
+        return self.query('SELECT COUNT(*) FROM postings WHERE address = ?', (address,))[0][0]
+
+    def address_page(self, address, before, limit):
+        """(cursor, height, position) of an address's transactions, newest first, before a cursor."""
+        sql = 'SELECT p.rowid, p.height, t.position FROM postings p JOIN txs t ON t.txid = p.txid WHERE p.address = ?'
+        params = [address]
+        if before is not None:
+            sql += ' AND p.rowid < ?'
+            params.append(before)
+        return self.query(sql + ' ORDER BY p.rowid DESC LIMIT ?', params + [limit])
+
+class CachedChain:
+    """One loaded chain: its blocks and mempool in memory plus its explorer index."""
+    def __init__(self, chain_file):
+        self.chain_file = chain_file
+        self.lock = threading.Lock()
+        self.index = ExplorerIndex(chain_file)
+        self.stamp = file_stamp(chain_file)  # Taken before loading, so a racing save is noticed next time.
+        with open(chain_file, 'rb') as f:
+            footer = blockchain.read_segment_index(f)
+        if footer is None:
+            raise ValueError(f"'{chain_file}' is a legacy chain file; run any blockchain.py command on it first")
+        self.blockchain = blockchain.load_blockchain(chain_file, COIN_NAME, journal=False)
+        self.journal_id = footer.get('journal')
+        self.journal_stamp = journal_stamp(chain_file)  # Also taken before reading.
+        pending, self.journal_offset = blockchain.read_journal(chain_file, self.journal_id)
+        self.blockchain.pending_transactions += pending
+        raw = sum(entry[4] for entry in footer['segments']) + footer['meta'][2]
+        self.size = raw * CHAIN_MEMORY_FACTOR
+        self.index.refresh()
+
+    def catch_up_journal(self):
+        """
+        Adds transactions journaled since the last check. Returns False if the journal was
+        replaced. The journal is only read when its file changed since the last read, so
+        one left over from another save (which holds nothing for us) is not rescanned on
+        every request.
+        """
+        stamp = journal_stamp(self.chain_file)
+        if stamp == self.journal_stamp:
+            return True
+        with self.lock:
+            pending, offset = blockchain.read_journal(self.chain_file, self.journal_id, self.journal_offset)
+            if pending is None:
+                return False
+            self.blockchain.pending_transactions += pending
+            self.journal_offset = offset
+            self.journal_stamp = stamp
+        return True
+
+    def block(self, height):
+        """A block from memory, or from the cold archive if it has been pruned."""
+        block = self.blockchain.get_block(height)
+        return block if block is not None else blockchain.read_history_block(self.chain_file, height)
+
+    def blocks(self, low, high):
+        first_loaded = self.blockchain.chain[0].index
+        if low < first_loaded:
+            return list(blockchain.iter_history(self.chain_file, low, min(high, first_loaded - 1))) + \
+                self.blockchain.get_blocks(first_loaded, high - first_loaded + 1)
+        return self.blockchain.get_blocks(low, high - low + 1)
+
+def file_stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def journal_stamp(chain_file):
+    """(inode, size) of a chain's mempool journal: it is only ever appended to or replaced."""
+    try:
+        st = os.stat(blockchain.journal_filename(chain_file))
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size)
+
+class ChainCache:
+    """
+    LRU cache of CachedChain objects keyed by real path (so one file is never cached
+    twice under different spellings), bounded by estimated memory.
+    An entry is reloaded when its chain file's mtime or size changes; growth of its
+    mempool journal is applied in place from the last offset read.
+    """
+    def __init__(self, max_bytes=CHAIN_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'journal_catchups': 0}
+
+    def get(self, chain_file):
+        chain_file = os.path.realpath(chain_file)
+        stamp = file_stamp(chain_file)
+        with self.lock:
+            entry = self.entries.get(chain_file)
+            if entry is not None and entry.stamp == stamp:
+                journal_offset = entry.journal_offset
+                if entry.catch_up_journal():
+                    self.entries.move_to_end(chain_file)
+                    self.counters['hits'] += 1
+                    if entry.journal_offset != journal_offset:
+                        self.counters['journal_catchups'] += 1
+                    return entry
+            if entry is not None:
+                self.counters['invalidations'] += 1
+                self.remove(chain_file)
+            self.counters['misses'] += 1
+        entry = CachedChain(chain_file)  # Loaded outside the lock so hot chains keep being served.
+        with self.lock:
+            if chain_file in self.entries:
+                self.remove(chain_file)
+            self.entries[chain_file] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                self.remove(next(iter(self.entries)))
+                self.counters['evictions'] += 1
+        return entry
+
+    def remove(self, chain_file):
+        self.size -= self.entries.pop(chain_file).size
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries), bytes=self.size, max_bytes=self.max_bytes,
+                        chains=[os.path.relpath(path, CHAIN_DIR) for path in self.entries])
+
+chains = ChainCache()
+
+def chain_path(name=None):
+    """
+    Maps a chain name from a URL to a file in CHAIN_DIR (ValueError if not a servable
+    chain), or no name to CHAIN_FILE. Returns the file's real path.
+    """
+    if name:
+        if not name.endswith('.dat'):
+            name += '.dat'
+        if name != os.path.basename(name) or name.startswith('.'):
+            raise ValueError(f"invalid chain name '{name}'")
+        path = os.path.join(CHAIN_DIR, name)
+    else:
+        path = CHAIN_FILE
+    if not os.path.isfile(path):
+        raise FileNotFoundError(os.path.basename(path))
+    return os.path.realpath(path)
+
+
+# Economy stats, updated incrementally from the scheduler's event stream.
+events = EventAggregator(EVENTS_FILE)
+events_lock = threading.Lock()
+
+def block_summary(block):
+    data = block.header()
+    data['tx_count'] = len(block.transactions) if isinstance(block.transactions, list) else 1
+    return data
+
+def tx_record(block, position):
+    transactions = block.transactions if isinstance(block.transactions, list) else [block.transactions]
+    tx = transactions[position]
+    return {'txid': blockchain.tx_id(tx), 'height': block.index, 'block_hash': block.hash,
+            'position': position, 'tx': tx}
+
 class BlockchainHandler(http.server.SimpleHTTPRequestHandler):
+    def not_modified(self, etag):
+        """True if the client's If-None-Match already lists this ETag."""
+        header = self.headers.get('If-None-Match', '')
+        return etag in [tag.strip() for tag in header.split(',')] or header.strip() == '*'
+
+    def send_json(self, data, status=200, etag=None, cache_control='no-cache'):
+        """Sends a JSON response, or an empty 304 if the client already holds this ETag."""
+        if etag and self.not_modified(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.end_headers()
+            return
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', cache_control)
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def cache_policy(self, index, height):
+        """Long-lived caching only for blocks deep enough that a reorg will not replace them."""
+        if index.tip_height() - height >= IMMUTABLE_CONFIRMATIONS:
+            return IMMUTABLE_CACHE
+        return 'no-cache'
+
+    def handle_explorer(self, parts, query, chain):
+        """
+        Routes /api/blocks, /api/blocks/<height>, /api/tx/<txid>, /api/address/<addr>,
+        /api/balance/<addr> and /api/stats for one cached chain.
+        """
+        index = chain.index
+        index.refresh()
+        tip = index.tip_height()
+        limit = max(1, min(MAX_PAGE_SIZE, int(query.get('limit', [PAGE_SIZE])[0])))
+
+        if parts == ['blocks']:
+            # Newest first; the cursor is the height to continue from.
+            cursor = min(tip, int(query.get('cursor', [tip])[0]))
+            low = max(0, cursor - limit + 1)
+            etag = '"blocks-%s-%d-%d"' % (index.block_hash(cursor) if cursor >= 0 else 'empty', cursor, limit)
+            if self.not_modified(etag):
+                return self.send_json(None, etag=etag)
+            blocks = [block_summary(b) for b in chain.blocks(low, cursor)] if cursor >= 0 else []
+            blocks.reverse()
+            return self.send_json({'blocks': blocks, 'tip': tip, 'next_cursor': low - 1 if low > 0 else None}, etag=etag)
+
+        if len(parts) == 2 and parts[0] == 'blocks':
+            height = int(parts[1])
+            if not 0 <= height <= tip:
+                return self.send_json({'error': 'block not found'}, status=404)
+            etag = '"%s"' % index.block_hash(height)
+            if self.not_modified(etag):
+                return self.send_json(None, etag=etag, cache_control=self.cache_policy(index, height))
+            block = chain.block(height)
+            data = block.to_dict()
+            data['txids'] = [blockchain.tx_id(tx) for tx in (block.transactions if isinstance(block.transactions, list) else [block.transactions])]
+            return self.send_json(data, etag=etag, cache_control=self.cache_policy(index, height))
+
+        if len(parts) == 2 and parts[0] == 'tx':
+            location = index.tx_location(parts[1])
+            if location is None:
+                return self.send_json({'error': 'transaction not found'}, status=404)
+            height, position = location
+            etag = '"%s-%s"' % (parts[1], index.block_hash(height))
+            if self.not_modified(etag):
+                return self.send_json(None, etag=etag, cache_control=self.cache_policy(index, height))
+            block = chain.block(height)
+            return self.send_json(tx_record(block, position), etag=etag, cache_control=self.cache_policy(index, height))
+
+        if len(parts) == 2 and parts[0] == 'address':
+            # Newest first; the cursor is opaque (an index row id) and continues the listing.
+            cursor = int(query['cursor'][0]) if 'cursor' in query else None
+            tx_count = index.address_tx_count(parts[1])
+            etag = '"addr-%s-%d-%s-%d"' % (index.tip[1] or 'empty', tx_count, cursor, limit)
+            if self.not_modified(etag):
+                return self.send_json(None, etag=etag)
+            rows = index.address_page(parts[1], cursor, limit + 1)
+            next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+            records = [tx_record(chain.block(height), position) for _, height, position in rows[:limit]]
+            return self.send_json({'address': parts[1], 'tx_count': tx_count, 'transactions': records,
+                                   'next_cursor': next_cursor}, etag=etag)
+
+        if len(parts) == 2 and parts[0] == 'balance':
+            bc = chain.blockchain
+            return self.send_json({'address': parts[1], 'balance': bc.calculate_balance(parts[1]),
+                                   'coin_name': bc.coin_name, 'height': tip})
+
+        if parts == ['stats']:
+            bc = chain.blockchain
+            return self.send_json({'height': tip + 1, 'last_hash': index.tip[1], 'tx_count': bc.tx_count(),
+                                   'pending': len(bc.pending_transactions), 'coin_name': bc.coin_name})
+
+        return self.send_json({'error': 'not found'}, status=404)
+
     def do_GET(self):
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.split('/') if p]
+        query = parse_qs(url.query)
+
+        if parts == ['api', 'cache']:
+            return self.send_json(chains.stats())
+        if parts == ['api', 'chains']:
+            names = sorted(name for name in os.listdir(CHAIN_DIR) if name.endswith('.dat'))
+            return self.send_json({'chains': names})
+
+        # The chain comes from /api/chains/<name>/..., then ?chain=<name>, then the default.
+        name = None
+        if len(parts) >= 4 and parts[:2] == ['api', 'chains']:
+            name, parts = parts[2], ['api'] + parts[3:]
+        elif 'chain' in query:
+            name = query['chain'][0]
+        if len(parts) >= 2 and parts[0] == 'api' and parts[1] in ('blocks', 'tx', 'address', 'balance', 'stats'):
+            try:
+                chain = chains.get(chain_path(name))
+                return self.handle_explorer(parts[1:], query, chain)
+            except (FileNotFoundError, OSError):
+                return self.send_json({'error': 'chain not found'}, status=404)
+            except ValueError as e:
+                return self.send_json({'error': f"bad request: {e}"}, status=400)
+
         if self.path == '/api/data':
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
@@ -37,40 +391,21 @@ class BlockchainHandler(http.server.SimpleHTTPRequestHandler):
             except:
                 bc_stats = {"height": 0, "tx_count": 0, "last_hash": "N/A"}
 
-            # 2. Parse Simulation Log for Economy Stats
-            jobs_completed = 0
-            credits_spent = 0
-            active_users = set()
-            recent_logs = []
+            # 2. Economy stats from the scheduler's event stream (only new events are read)
+            with events_lock:
+                events.update()
+                economy = events.summary()
+            economy.pop('recent')
 
+            # The console log is only shown, never parsed.
+            recent_logs = []
             if os.path.exists(LOG_FILE):
                 with open(LOG_FILE, 'r') as f:
-                    lines = f.readlines()
-                    # Get last 20 lines for log view
-                    recent_logs = [l.strip() for l in lines[-20:]]
-                    
-                    for line in lines:
-                        if "Job completed" in line:
-                            jobs_completed += 1
-                        
-                        # Extract Cost: "💰 TOTAL COST:    112 HPCCredit"
-                        cost_match = re.search(r"TOTAL COST:\s+(\d+)", line)
-                        if cost_match:
-                            credits_spent += int(cost_match.group(1))
-                        
-                        # Extract User: "User:      Bob"
-                        user_match = re.search(r"User:\s+(\w+)", line)
-                        if user_match:
-                            active_users.add(user_match.group(1))
+                    recent_logs = [l.strip() for l in f.readlines()[-20:]]
 
             data = {
                 "blockchain": bc_stats,
-                "economy": {
-                    "jobs_completed": jobs_completed,
-                    "credits_spent": credits_spent,
-                    "active_users": len(active_users),
-                    "user_list": list(active_users)
-                },
+                "economy": economy,
                 "logs": recent_logs
             }
             
@@ -82,9 +417,10 @@ class BlockchainHandler(http.server.SimpleHTTPRequestHandler):
 def run_simulation():
     global sim_process
     print("🚀 Starting Simulation Background Process...")
-    # Clear log
+    # Clear log and events
     with open(LOG_FILE, 'w') as f:
         f.write("--- Simulation Started ---\n")
+    open(EVENTS_FILE, 'w').close()
     
     # Start script
     sim_process = subprocess.Popen([SIM_SCRIPT, "auto"], stdout=open(LOG_FILE, 'a'), stderr=subprocess.STDOUT)
@@ -108,5 +444,6 @@ if __name__ == "__main__":
     print(f"🌍 Dashboard running at http://localhost:{PORT}")
     print("Press Ctrl+C to stop.")
     
-    with socketserver.TCPServer(("", PORT), BlockchainHandler) as httpd:
+    # Threaded so many dashboard users can browse the explorer at once.
+    with http.server.ThreadingHTTPServer(("", PORT), BlockchainHandler) as httpd:
         httpd.serve_forever()
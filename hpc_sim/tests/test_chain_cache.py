@@ -0,0 +1,74 @@
+"""
+The explorer's chain cache holds each chain file once, however its path is spelled,
+and only reads a chain's mempool journal again when the journal file has changed.
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+import server  # noqa: E402
+
+
+class ChainCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='chain_cache_')
+        self.cwd = os.getcwd()
+        os.chdir(self.workdir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            blockchain.save_blockchain(blockchain.Blockchain(mode='tool', coin_name='HPCCredit'), server.CHAIN_FILE)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_one_entry_per_file(self):
+        cache = server.ChainCache()
+        default = cache.get(server.chain_path())
+        by_name = cache.get(server.chain_path('hpc_campus'))
+        by_relative_path = cache.get(os.path.join('.', server.CHAIN_FILE))
+        self.assertIs(default, by_name)
+        self.assertIs(default, by_relative_path)
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['misses'], stats['hits']), (1, 1, 2))
+        self.assertEqual(stats['bytes'], default.size)
+
+    def test_foreign_journal_is_read_once(self):
+        # A journal left over from another save (e.g. a crash before the save reset it).
+        blockchain.reset_journal(server.CHAIN_FILE, 'f' * 16)
+        payload = json.dumps({'type': 'currency', 'sender': 'x', 'recipient': 'y', 'amount': 1}).encode()
+        with open(blockchain.journal_filename(server.CHAIN_FILE), 'ab') as f:
+            for _ in range(100):
+                f.write(blockchain._JOURNAL_RECORD.pack(len(payload), zlib.crc32(payload)) + payload)
+        cache = server.ChainCache()
+        entry = cache.get(server.CHAIN_FILE)
+        with mock.patch.object(blockchain, 'read_journal', wraps=blockchain.read_journal) as read_journal:
+            for _ in range(3):
+                self.assertIs(cache.get(server.CHAIN_FILE), entry)
+            self.assertLessEqual(read_journal.call_count, 1)
+            transfer = {'type': 'currency', 'sender': 'a', 'recipient': 'b', 'amount': 1, 'timestamp': 1.0}
+            self.assertTrue(blockchain.append_journal(server.CHAIN_FILE, transfer))
+            self.assertIs(cache.get(server.CHAIN_FILE), entry)
+            self.assertEqual(entry.blockchain.pending_transactions, [transfer])
+
+    def test_bad_names(self):
+        with self.assertRaises(ValueError):
+            server.chain_path('../hpc_campus')
+        with self.assertRaises(FileNotFoundError):
+            server.chain_path('missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+"""scheduler.py's cluster simulation never lets a user's queued jobs overdraw their balance."""
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import scheduler  # noqa: E402
+
+
+class ClusterSimulationTest(unittest.TestCase):
+
+    def test_queued_jobs_cannot_overdraw(self):
+        # One single-core node, so the jobs queue; each costs 1 core x 4 h x 10 = 40 credits.
+        cluster = scheduler.Cluster(nodes=1, cores=1, gpus=0, mem=8)
+        workload = [{'submit': 0.0, 'user': 'Bob', 'cpu_cores': 1, 'gpus': 0, 'mem': 0, 'hours': 4}
+                    for _ in range(3)]
+        balances = {'Bob': 100}
+        report = scheduler.simulate_cluster(workload, cluster, balances)
+        self.assertEqual(report['jobs_completed'], 2)
+        self.assertEqual(report['rejected']['insufficient_funds'], 1)
+        self.assertEqual(report['credits_charged'], 80)
+        self.assertEqual(balances['Bob'], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
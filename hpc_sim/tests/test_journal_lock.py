@@ -0,0 +1,91 @@
+"""
+Transactions admitted while other processes mine must all reach the chain, and
+admitting one must not wait for a miner: `mine` only holds the chain lock to build
+its block and to save it, and journal appends take the lock briefly.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+
+
+class JournalLockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='journal_lock_')
+        self.chain = os.path.join(self.workdir, 'locked.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def start_tool(self, *args):
+        return subprocess.Popen([sys.executable, os.path.join(HPC_SIM, 'blockchain.py'), '--chain', self.chain]
+                                + list(args), cwd=self.workdir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def run_all(self, procs):
+        for proc in procs:
+            _, stderr = proc.communicate(timeout=300)
+            self.assertEqual(proc.returncode, 0, stderr)
+
+    def test_concurrent_mines_and_appends(self):
+        self.run_all([self.start_tool('mine', '--miner', 'bank', '--reward', '1000')])
+        procs = []
+        for i in range(12):
+            procs.append(self.start_tool('transfer', '--from', 'bank', '--to', f"user{i}", '--amount', '10'))
+            if i % 3 == 0:
+                procs.append(self.start_tool('mine', '--miner', 'bank', '--reward', '0'))
+        self.run_all(procs)
+        self.run_all([self.start_tool('mine', '--miner', 'bank', '--reward', '0')])
+
+        chain = blockchain.load_blockchain(self.chain, 'MultiCoin')
+        self.assertTrue(chain.is_valid_chain(chain.chain))
+        self.assertEqual(chain.pending_transactions, [])
+        for i in range(12):
+            self.assertEqual(chain.calculate_balance(f"user{i}"), 10)
+        self.assertEqual(chain.calculate_balance('bank'), 1000 - 120)
+
+    def test_zero_filled_tail_is_ignored(self):
+        self.run_all([self.start_tool('mine', '--miner', 'bank', '--reward', '1000')])
+        self.run_all([self.start_tool('transfer', '--from', 'bank', '--to', 'alice', '--amount', '10')])
+        # What a crash can leave behind on filesystems that allocate before they write.
+        with open(blockchain.journal_filename(self.chain), 'ab') as f:
+            f.write(b'\0' * 4096)
+        self.run_all([self.start_tool('transfer', '--from', 'bank', '--to', 'bob', '--amount', '10')])
+        chain = blockchain.load_blockchain(self.chain, 'MultiCoin')
+        self.assertEqual([tx['recipient'] for tx in chain.pending_transactions], ['alice', 'bob'])
+
+    def test_notarize_does_not_wait_for_mining(self):
+        self.run_all([self.start_tool('mine', '--miner', 'bank', '--reward', '1000')])
+        chain = blockchain.load_blockchain(self.chain, 'MultiCoin')
+        chain.difficulty = 12  # Out of reach, so the next `mine` runs until its timeout.
+        blockchain.save_blockchain(chain, self.chain, quiet=True)
+        self.run_all([self.start_tool('transfer', '--from', 'bank', '--to', 'alice', '--amount', '10')])
+        miner = self.start_tool('mine', '--miner', 'bank', '--reward', '0', '--timeout', '6')
+        try:
+            time.sleep(1)  # Let it build its block and start searching.
+            job = os.path.join(self.workdir, 'job.out')
+            with open(job, 'w') as f:
+                f.write('result\n')
+            started = time.monotonic()
+            self.run_all([self.start_tool('notarize', '--file', job, '--owner', 'alice')])
+            self.assertLess(time.monotonic() - started, 3)
+            self.assertIsNone(miner.poll(), 'mine finished before the notarization was admitted')
+        finally:
+            _, stderr = miner.communicate(timeout=60)
+        self.assertEqual(miner.returncode, blockchain.EXIT_MINING_INTERRUPTED, stderr)
+
+        chain = blockchain.load_blockchain(self.chain, 'MultiCoin')
+        self.assertEqual([tx['type'] for tx in chain.pending_transactions], ['currency', 'notarization'])
+
+
+if __name__ == '__main__':
+    unittest.main()
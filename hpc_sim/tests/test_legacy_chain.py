@@ -0,0 +1,86 @@
+"""
+Chain files written by the original blockchain.py (one pickled Blockchain, saved with
+the classes under '__main__') must stay readable by the current tool.
+
+data/baseline_chain.dat was made with that script: a 1000-credit reward to HPC_Core,
+then one block notarizing a file (sha256 c10fe2e6...) and transferring 250 to alice.
+"""
+import csv
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+
+BASELINE_CHAIN = os.path.join(HERE, 'data', 'baseline_chain.dat')
+NOTARIZED_HASH = 'c10fe2e62716d6ee7704d773d0f1e452aeb0dc03858d8d195e466a6e70c2f980'
+
+
+class LegacyChainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='legacy_chain_')
+        self.chain = os.path.join(self.workdir, 'baseline.dat')
+        shutil.copy(BASELINE_CHAIN, self.chain)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def run_tool(self, *args):
+        return subprocess.run([sys.executable, os.path.join(HPC_SIM, 'blockchain.py'), '--chain', self.chain,
+                               '--coin-name', 'HPCCredit'] + list(args),
+                              cwd=self.workdir, capture_output=True, text=True, timeout=120)
+
+    def test_load_blockchain(self):
+        chain = blockchain.load_blockchain(self.chain, 'HPCCredit')
+        self.assertEqual([block.index for block in chain.chain], [0, 1, 2])
+        self.assertTrue(chain.is_valid_chain(chain.chain))
+        self.assertEqual(chain.calculate_balance('alice'), 250)
+        self.assertEqual(chain.calculate_balance('HPC_Core'), 750)
+        self.assertEqual(chain.find_hash(NOTARIZED_HASH)[0], 2)
+
+    def test_block_readers(self):
+        self.assertEqual([block.index for block in blockchain.iter_blocks(self.chain)], [0, 1, 2])
+        self.assertEqual([block.index for block in blockchain.iter_blocks(self.chain, 1, 1)], [1])
+        self.assertEqual(blockchain.read_block(self.chain, 2).index, 2)
+        self.assertIsNone(blockchain.read_block(self.chain, 3))
+        self.assertEqual([block.index for block in blockchain.iter_history(self.chain)], [0, 1, 2])
+        self.assertEqual(blockchain.read_history_block(self.chain, 1).index, 1)
+
+    def test_cli_commands(self):
+        for args in (('export',), ('balance', '--address', 'alice'), ('stats',)):
+            result = self.run_tool(*args)
+            self.assertEqual(result.returncode, 0, result.stderr)
+        result = self.run_tool('history', '--address', 'alice')
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('250', result.stdout)
+
+    def test_export_txids(self):
+        result = self.run_tool('export', '--format', 'csv')
+        self.assertEqual(result.returncode, 0, result.stderr)
+        rows = list(csv.DictReader(io.StringIO(result.stdout)))
+        transfer = next(row for row in rows if row['recipient'] == 'alice')
+        self.assertEqual(len(transfer['txid']), 64)
+        result = self.run_tool('tx', transfer['txid'])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('alice', result.stdout)
+
+    def test_upgraded_on_save(self):
+        self.assertIsNone(blockchain.storage_stats(self.chain))
+        self.assertEqual(self.run_tool('transfer', '--from', 'alice', '--to', 'bob', '--amount', '50').returncode, 0)
+        stats = blockchain.storage_stats(self.chain)
+        self.assertEqual(stats['height'], 3)
+        chain = blockchain.load_blockchain(self.chain, 'HPCCredit')
+        self.assertEqual(len(chain.pending_transactions), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
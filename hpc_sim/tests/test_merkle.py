@@ -0,0 +1,75 @@
+"""Files notarized with --merkle: chunk hashing, audit paths, and `verify --chunk`."""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+
+MIB = 1 << 20
+
+
+class MerkleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='merkle_')
+        self.chain = os.path.join(self.workdir, 'merkle.dat')
+        self.data = os.path.join(self.workdir, 'dataset.bin')
+        with open(self.data, 'wb') as f:
+            f.write(os.urandom(3 * MIB + MIB // 2))  # Four 1 MiB chunks, the last one partial.
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def run_tool(self, *args):
+        result = subprocess.run([sys.executable, os.path.join(HPC_SIM, 'blockchain.py'), '--chain', self.chain]
+                                + list(args), cwd=self.workdir, capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        return result.stdout
+
+    def corrupt(self, offset):
+        with open(self.data, 'r+b') as f:
+            f.seek(offset)
+            byte = f.read(1)
+            f.seek(offset)
+            f.write(bytes([byte[0] ^ 0xff]))
+
+    def test_hash_chunks(self):
+        leaves = blockchain.hash_chunks(self.data, MIB, workers=1)
+        self.assertEqual(len(leaves), 4)
+        self.assertEqual(blockchain.hash_chunks(self.data, MIB, workers=2), leaves)
+        self.assertEqual(blockchain.hash_chunks(self.data, MIB, chunks=[3, 1], workers=2), [leaves[3], leaves[1]])
+        with open(self.data, 'rb') as f:
+            f.seek(3 * MIB)
+            self.assertEqual(leaves[3], blockchain.merkle_leaf(f.read()))
+        root = blockchain.merkle_root(leaves)
+        for n, leaf in enumerate(leaves):
+            self.assertTrue(blockchain.verify_merkle_proof(leaf, blockchain.merkle_proof(leaves, n), root.hex()))
+        self.assertFalse(blockchain.verify_merkle_proof(leaves[0], blockchain.merkle_proof(leaves, 1), root.hex()))
+
+    def test_notarize_and_verify_chunks(self):
+        self.run_tool('notarize', '--owner', 'alice', '--file', self.data, '--merkle', '--chunk-size', '1')
+        self.assertTrue(os.path.exists(blockchain.merkle_manifest_filename(self.data)))
+        self.run_tool('mine', '--miner', 'miner')
+        self.assertIn('Verification Successful', self.run_tool('verify', self.data))
+
+        self.corrupt(2 * MIB + 12345)
+        self.assertIn('Verification Failed', self.run_tool('verify', self.data))
+        out = self.run_tool('verify', self.data, '--chunk', '0', '--chunk', '2', '--chunk', '3')
+        self.assertIn('Chunk 0 matches', out)
+        self.assertIn(f"Chunk 2 does not match: bytes {2 * MIB}-{3 * MIB - 1} differ", out)
+        self.assertIn('Chunk 3 matches', out)
+
+        out = self.run_tool('verify', self.data, '--chunk', '4')
+        self.assertIn('No chunk 4: the file was notarized as chunks 0-3.', out)
+        self.assertNotIn('matches', out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+`verify` across many chains only reads them (sidecar indexes are left to the commands
+that save), and reports files in --chain-dir that are not chains instead of failing.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+
+
+class MultiChainVerifyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='multi_verify_')
+        self.chains = os.path.join(self.workdir, 'chains')
+        os.mkdir(self.chains)
+        self.job = os.path.join(self.workdir, 'job.out')
+        with open(self.job, 'w') as f:
+            f.write('result\n')
+        self.physics = os.path.join(self.chains, 'physics.dat')
+        self.biology = os.path.join(self.chains, 'biology.dat')
+        self.run_tool(self.physics, 'notarize', '--file', self.job, '--owner', 'alice')
+        self.run_tool(self.physics, 'mine', '--miner', 'miner')
+        self.run_tool(self.biology, 'mine', '--miner', 'miner')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def run_tool(self, chain, *args):
+        result = subprocess.run([sys.executable, os.path.join(HPC_SIM, 'blockchain.py'), '--chain', chain]
+                                + list(args), cwd=self.workdir, capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        return result.stdout
+
+    def test_verify_does_not_write_indexes(self):
+        sidecars = [blockchain.bloom_filename(self.physics), blockchain.tx_index_filename(self.physics),
+                    blockchain.time_index_filename(self.physics)]
+        for sidecar in sidecars:
+            os.remove(sidecar)
+        out = self.run_tool(self.physics, 'verify', self.job, '--chain', self.physics, '--chain', self.biology)
+        self.assertIn(f"found in '{self.physics}' in Block #1", out)
+        for sidecar in sidecars:
+            self.assertFalse(os.path.exists(sidecar), sidecar)
+
+    def test_chain_dir_skips_files_that_are_not_chains(self):
+        archive = os.path.join(self.chains, 'physics-cold.dat')
+        blockchain.archive_blocks(list(blockchain.iter_blocks(self.physics, 0, 0)), archive)
+        with open(os.path.join(self.chains, 'notes.dat'), 'w') as f:
+            f.write('not a chain\n')
+        out = self.run_tool(self.physics, 'verify', self.job, '--chain-dir', self.chains)
+        self.assertIn(f"found in '{self.physics}' in Block #1", out)
+        self.assertIn(f"Skipped '{archive}': a cold archive", out)
+        self.assertIn(f"Skipped '{os.path.join(self.chains, 'notes.dat')}': unreadable", out)
+
+
+if __name__ == '__main__':
+    unittest.main()
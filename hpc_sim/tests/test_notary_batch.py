@@ -0,0 +1,92 @@
+"""Batch notarization: submit -> commit -> mine -> `verify --receipt`."""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+import notary_batch  # noqa: E402
+
+
+class NotaryBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='notary_batch_')
+        self.chain = os.path.join(self.workdir, 'batch.dat')
+        self.files = []
+        for i in range(5):
+            filename = os.path.join(self.workdir, f"job_{i}.out")
+            with open(filename, 'w') as f:
+                f.write(f"result {i}\n")
+            self.files.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def run_script(self, script, *args):
+        result = subprocess.run([sys.executable, os.path.join(HPC_SIM, script), '--chain', self.chain] + list(args),
+                                cwd=self.workdir, capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        return result.stdout
+
+    def submit_all(self):
+        args = [arg for filename in self.files for arg in ('--file', filename)]
+        self.run_script('notary_batch.py', 'submit', '--owner', 'alice', *args)
+        with open(notary_batch.queue_filename(self.chain)) as f:
+            return [json.loads(line)['id'] for line in f]
+
+    def verify(self, receipt, filepath=None):
+        args = ['verify', '--receipt', receipt] + ([filepath] if filepath else [])
+        return self.run_script('blockchain.py', *args)
+
+    def test_batch_receipts(self):
+        ids = self.submit_all()
+        self.assertEqual(len(ids), 5)
+        self.assertIn('Batch of 5 requests committed', self.run_script('notary_batch.py', 'commit'))
+        self.assertIn('No queued requests', self.run_script('notary_batch.py', 'commit'))
+
+        chain = blockchain.load_blockchain(self.chain, 'MultiCoin')
+        batches = [tx for tx in chain.pending_transactions if tx.get('hash_mode') == blockchain.HASH_MODE_BATCH]
+        self.assertEqual([tx['batch_size'] for tx in batches], [5])
+
+        receipt = notary_batch.receipt_filename(self.chain, ids[3])
+        self.assertIn('not mined yet', self.verify(receipt))
+        self.run_script('blockchain.py', 'mine', '--miner', 'miner')
+        for request_id, filename in zip(ids, self.files):
+            out = self.verify(notary_batch.receipt_filename(self.chain, request_id), filename)
+            self.assertIn('Receipt checks out', out)
+        self.assertIn('different file', self.verify(receipt, self.files[0]))
+
+    def test_tampered_receipt(self):
+        ids = self.submit_all()
+        self.run_script('notary_batch.py', 'commit')
+        self.run_script('blockchain.py', 'mine', '--miner', 'miner')
+        with open(notary_batch.receipt_filename(self.chain, ids[0])) as f:
+            receipt = json.load(f)
+
+        tampered = os.path.join(self.workdir, 'tampered.json')
+        side, sibling = receipt['proof'][0]
+        receipt['proof'][0] = [side, ('0' if sibling[0] != '0' else '1') + sibling[1:]]
+        with open(tampered, 'w') as f:
+            json.dump(receipt, f)
+        out = self.verify(tampered)
+        self.assertIn("audit path does not lead to its root", out)
+        self.assertNotIn('Receipt checks out', out)
+
+        # A self-consistent receipt for a root that was never notarized.
+        forged = os.path.join(self.workdir, 'forged.json')
+        leaf = blockchain.batch_leaf(receipt['request'])
+        with open(forged, 'w') as f:
+            json.dump(dict(receipt, proof=[], root=leaf.hex()), f)
+        self.assertIn('root is not in the blockchain', self.verify(forged))
+
+
+if __name__ == '__main__':
+    unittest.main()
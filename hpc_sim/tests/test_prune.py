@@ -0,0 +1,65 @@
+"""Pruned blocks stay readable from their cold archive, wherever `prune --archive` put it."""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+
+
+class PruneTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='prune_')
+        self.chain = os.path.join(self.workdir, 'pruned.dat')
+        for _ in range(6):
+            self.run_tool('mine', '--miner', 'miner', '--reward', '10')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def run_tool(self, *args, cwd=None):
+        result = subprocess.run([sys.executable, os.path.join(HPC_SIM, 'blockchain.py'), '--chain', self.chain]
+                                + list(args), cwd=cwd or self.workdir, capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        return result.stdout
+
+    def prune(self, height, *args):
+        snapshot = os.path.join(self.workdir, f"at_{height}.snapshot")
+        self.run_tool('snapshot', '--height', str(height), '--out', snapshot)
+        return self.run_tool('prune', '--snapshot', snapshot, *args)
+
+    def exported_heights(self, cwd=None):
+        return [json.loads(line)['height'] for line in self.run_tool('export', cwd=cwd).splitlines()]
+
+    def test_custom_archive_is_remembered(self):
+        os.mkdir(os.path.join(self.workdir, 'cold'))
+        self.prune(3, '--archive', os.path.join(self.workdir, 'cold', 'archive.dat'))
+        self.assertFalse(os.path.exists(self.chain + '.cold'))
+        self.assertEqual(self.exported_heights(), list(range(7)))
+        self.assertEqual(self.exported_heights(cwd=os.path.join(self.workdir, 'cold')), list(range(7)))
+        self.assertEqual(blockchain.read_history_block(self.chain, 1).index, 1)
+        # A later prune keeps using the same archive.
+        self.prune(5)
+        self.assertFalse(os.path.exists(self.chain + '.cold'))
+        self.assertEqual(self.exported_heights(), list(range(7)))
+
+    def test_rearchiving_skips_archived_heights(self):
+        archive = os.path.join(self.workdir, 'archive.cold')
+        blocks = list(blockchain.iter_blocks(self.chain, 0, 3))
+        blockchain.archive_blocks(blocks[:2], archive)
+        # As after a crash between archiving and saving the pruned chain: the same blocks again.
+        blockchain.archive_blocks(blocks, archive)
+        blockchain.archive_blocks(blocks, archive)
+        self.assertEqual([block.index for block in blockchain.iter_blocks(archive)], [0, 1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
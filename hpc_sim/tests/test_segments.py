@@ -0,0 +1,72 @@
+"""Saving a chain only compresses the segments that changed; the rest is copied as stored."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+
+
+def make_chain(blocks, miner='miner'):
+    chain = blockchain.Blockchain()
+    chain.difficulty = 1
+    chain.storage = {'codec': 'zlib', 'level': 6}
+    for _ in range(blocks):
+        chain.mine_pending_transactions(miner, custom_reward=10)
+    return chain
+
+
+class SegmentReuseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='segments_')
+        self.chain_file = os.path.join(self.workdir, 'segments.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def save(self, chain):
+        """Saves the chain and returns how many blobs (segments and meta) were compressed."""
+        with mock.patch.object(blockchain, '_compress', wraps=blockchain._compress) as compress:
+            blockchain.save_blockchain(chain, self.chain_file, quiet=True)
+        return compress.call_count
+
+    def footer(self):
+        with open(self.chain_file, 'rb') as f:
+            return blockchain.read_segment_index(f)
+
+    def test_save_compresses_only_the_tail(self):
+        chain = make_chain(140)
+        self.assertEqual(self.save(chain), 4)  # Blocks 0-63, 64-127, 128-140, and the meta.
+        chain.mine_pending_transactions('miner', custom_reward=10)
+        self.assertEqual(self.save(chain), 2)  # The tail segment and the meta.
+        self.assertEqual([entry[:2] for entry in self.footer()['segments']], [[0, 64], [64, 64], [128, 14]])
+        loaded = blockchain.load_blockchain(self.chain_file, 'MultiCoin')
+        self.assertEqual([block.hash for block in loaded.chain], [block.hash for block in chain.chain])
+        self.assertEqual(blockchain.read_block(self.chain_file, 100).hash, chain.get_block(100).hash)
+
+    def test_changed_blocks_are_rewritten(self):
+        self.save(make_chain(70))
+        other = make_chain(70, miner='someone else')
+        self.assertEqual(self.save(other), 3)
+        loaded = blockchain.load_blockchain(self.chain_file, 'MultiCoin')
+        self.assertEqual([block.hash for block in loaded.chain], [block.hash for block in other.chain])
+
+    def test_prune_keeps_later_segments(self):
+        chain = make_chain(140)
+        self.save(chain)
+        chain.prune(100)
+        self.assertEqual(self.save(chain), 2)  # Blocks 100-127 (what is left of that segment) and the meta.
+        self.assertEqual([entry[:2] for entry in self.footer()['segments']], [[100, 28], [128, 13]])
+        loaded = blockchain.load_blockchain(self.chain_file, 'MultiCoin')
+        self.assertEqual([block.hash for block in loaded.chain], [block.hash for block in chain.chain])
+
+
+if __name__ == '__main__':
+    unittest.main()
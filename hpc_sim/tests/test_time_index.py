@@ -0,0 +1,59 @@
+"""The `usage` report brings the time index up to date under the chain lock, replacing it atomically."""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+
+
+class TimeIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='time_index_')
+        self.chain = os.path.join(self.workdir, 'usage.dat')
+        for _ in range(3):
+            self.run_tool('mine', '--miner', 'miner', '--reward', '10')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def start_tool(self, *args):
+        return subprocess.Popen([sys.executable, os.path.join(HPC_SIM, 'blockchain.py'), '--chain', self.chain]
+                                + list(args), cwd=self.workdir, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=True)
+
+    def run_tool(self, *args):
+        proc = self.start_tool(*args)
+        out, err = proc.communicate(timeout=120)
+        self.assertEqual(proc.returncode, 0, err)
+        return out
+
+    def test_usage_updates_index_under_lock(self):
+        index = blockchain.time_index_filename(self.chain)
+        os.remove(index)
+        with blockchain.ChainLock(self.chain):
+            usage = self.start_tool('usage', '--json')
+            time.sleep(1)
+            self.assertIsNone(usage.poll(), 'usage ran while another process held the chain lock')
+            self.assertFalse(os.path.exists(index))
+        out, err = usage.communicate(timeout=120)
+        self.assertEqual(usage.returncode, 0, err)
+        self.assertEqual(blockchain.heights_between(self.chain), (0, 3))
+
+    def test_index_is_replaced_not_rewritten_in_place(self):
+        index = blockchain.time_index_filename(self.chain)
+        before = os.stat(index).st_ino
+        self.run_tool('mine', '--miner', 'miner', '--reward', '10')
+        self.assertNotEqual(os.stat(index).st_ino, before)
+        self.assertEqual(blockchain.heights_between(self.chain), (0, 4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""Concurrent transfers from one account can never spend more than it holds."""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HPC_SIM = os.path.dirname(HERE)
+sys.path.insert(0, HPC_SIM)
+
+import blockchain  # noqa: E402
+
+
+class TransferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='transfer_')
+        self.chain = os.path.join(self.workdir, 'transfer.dat')
+        self.assertEqual(self.start_tool('mine', '--miner', 'bob', '--reward', '100').wait(timeout=120), 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def start_tool(self, *args):
+        return subprocess.Popen([sys.executable, os.path.join(HPC_SIM, 'blockchain.py'), '--chain', self.chain]
+                                + list(args), cwd=self.workdir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def test_concurrent_transfers_cannot_overdraw(self):
+        procs = [self.start_tool('transfer', '--from', 'bob', '--to', f"job{i}", '--amount', '30') for i in range(6)]
+        codes = sorted(proc.wait(timeout=120) for proc in procs)
+        self.assertEqual(codes, [0, 0, 0] + [blockchain.EXIT_INSUFFICIENT_FUNDS] * 3)
+        self.assertEqual(self.start_tool('mine', '--miner', 'bob', '--reward', '0').wait(timeout=120), 0)
+        chain = blockchain.load_blockchain(self.chain, 'MultiCoin')
+        self.assertEqual(chain.calculate_balance('bob'), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()